@@ -0,0 +1,69 @@
+#windowing of live sensor streams, same windows as get_act_time_sequences on the whole recording
+
+import numpy as np
+
+
+class ActStreamWindower(object):
+    """
+    incremental get_act_time_sequences
+    push chunks of any size and get (window, y, u) for every window as soon as its last sample
+    arrives, identical (including run breaks) to windowing the concatenated stream at once
+    label and subject columns are optional; without them the stream is one run and y, u are None
+
+    samples live in a fixed ring buffer: O(1) work per sample and nothing is reallocated
+    push() stores the whole chunk before it returns and hands back copies, so the windows stay valid
+    """
+
+    def __init__(self, nb_feature, window_size, step, dtype=np.float32):
+        self.window_size = window_size
+        self.step = step
+        #a run break moves the next window back by less than max(window_size, step) samples
+        self.capacity = window_size + step
+        #every sample is written at i % capacity and i % capacity + capacity,
+        #so the last capacity samples can always be read as one contiguous slice
+        self.buffer = np.zeros((2 * self.capacity, nb_feature), dtype=dtype)
+
+        self.nb_seen = 0
+        self.start = 0
+        self.y = None
+        self.u = None
+        #label/subject of the newest sample and the index its run starts at
+        self.last = None
+        self.run_start = 0
+
+    def push(self, samples, labels=None, subjects=None):
+        """
+        list of (window, y, u) completed by this chunk, in stream order
+        """
+        output = []
+        for i in range(len(samples)):
+            label = None if labels is None else labels[i]
+            subject = None if subjects is None else subjects[i]
+            self._push_one(samples[i], label, subject, output)
+        return output
+
+    def _push_one(self, sample, label, subject, output):
+        index = self.nb_seen
+        pos = index % self.capacity
+        self.buffer[pos] = sample
+        self.buffer[pos + self.capacity] = sample
+
+        if index == 0:
+            self.y, self.u = label, subject
+        elif label != self.last[0] or subject != self.last[1]:
+            self.run_start = index
+        self.last = (label, subject)
+        self.nb_seen += 1
+
+        #every end up to index lies in the newest run, so its label is the newest label
+        while self.start + self.window_size - 1 <= index:
+            if label != self.y or subject != self.u:
+                self.y, self.u = label, subject
+                #get_act_time_sequences never resets to a run starting at row 1
+                if self.run_start > 1:
+                    self.start = self.run_start
+            else:
+                first = self.start % self.capacity
+                #later samples of the same chunk overwrite the ring, the window is copied out now
+                output.append((self.buffer[first: first + self.window_size].copy(), self.y, self.u))
+                self.start += self.step
@@ -0,0 +1,52 @@
+#throughput of PureTran_torch with seq-first (attention over the batch) and batch-first (attention over the window),
+#with and without the cls_only inference path
+#both models share the same weights, loaded through load_puretran_torch
+
+import torch
+from puretran_torch import PureTran_torch, load_puretran_torch
+from bench_utils import best_of, device, nb_feature, puretran_hparams, window_size
+
+hparams = puretran_hparams()
+repeat = 5
+
+torch.manual_seed(1)
+seq_first = PureTran_torch(**hparams).to(device).eval()
+batch_first = load_puretran_torch(seq_first.state_dict(), batch_first=True, **hparams).to(device).eval()
+
+
+@torch.no_grad()
+def latency(model, x):
+    return best_of(lambda: model(x), repeat)
+
+
+#batch-first predictions of a window do not depend on the rest of the batch
+x = torch.randn(64, window_size, nb_feature, device=device)
+with torch.no_grad():
+    for name, model in [('seq-first', seq_first), ('batch-first', batch_first)]:
+        alone = model(x[:1])
+        batched = model(x)[:1]
+        print(name, 'max |single - batched|:', f'{(alone - batched).abs().max().item():.2e}')
+
+print('device:', device)
+for batch_size in [250, 1000, 2000]:
+    x = torch.randn(batch_size, window_size, nb_feature, device=device)
+    t_seq = latency(seq_first, x)
+    t_batch = latency(batch_first, x)
+    print('batch:', batch_size,
+          '\tseq-first:', f'{batch_size / t_seq:9.0f} windows/s',
+          '\tbatch-first:', f'{batch_size / t_batch:9.0f} windows/s',
+          '\tspeedup:', f'{t_seq / t_batch:.1f}x')
+
+#cls_only: the last layer (seq-first: every layer) computes only the rows the decoder reads
+print()
+for mode in [False, True]:
+    full = load_puretran_torch(seq_first.state_dict(), batch_first=mode, **hparams).to(device).eval()
+    cls = load_puretran_torch(seq_first.state_dict(), batch_first=mode, cls_only=True, **hparams).to(device).eval()
+    x = torch.randn(1000, window_size, nb_feature, device=device)
+    with torch.no_grad():
+        diff = (full(x) - cls(x)).abs().max().item()
+    t_full = latency(full, x)
+    t_cls = latency(cls, x)
+    print('batch-first' if mode else 'seq-first', '\tmax |full - cls_only|:', f'{diff:.2e}',
+          '\tfull:', f'{t_full * 1e3:.1f} ms', '\tcls_only:', f'{t_cls * 1e3:.1f} ms',
+          '\tspeedup:', f'{t_full / t_cls:.1f}x')
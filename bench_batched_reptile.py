@@ -0,0 +1,71 @@
+#Reptile throughput: the serial task loop of meta_reptile_lopo.py vs BatchedReptile over groups of tasks
+#parity is checked with dropout off: the batched inner loops must land where the serial ones do
+
+from copy import deepcopy
+import torch
+import torch.nn.functional as F
+from puretran_torch import PureTran_torch
+from reptile import BatchedReptile, FlatReptile, InnerOptimizer
+from bench_utils import device, nb_classes, nb_feature, puretran_hparams, timed, window_size
+
+hparams = puretran_hparams()
+innerstepsize = 2e-3
+outerstepsize = 0.02
+innerepochs = 5
+nb_tasks = 9
+#windows per task, users differ in how many they have
+task_sizes = [48, 64, 56, 40, 64, 52, 60, 44, 64]
+
+torch.manual_seed(1)
+tasks = [(torch.randn(n, window_size, nb_feature, device=device), torch.randint(0, nb_classes, (n,), device=device))
+         for n in task_sizes[:nb_tasks]]
+
+
+def inner_loop(model, optimizer, x, y):
+    for _ in range(innerepochs):
+        optimizer.zero_grad()
+        outputs = model(x).reshape(-1, nb_classes).float()
+        loss = F.cross_entropy(outputs, y)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
+        optimizer.step()
+
+
+#parity: mean of the serial inner-loop results from the same meta-weights vs one batched group
+meta = PureTran_torch(**dict(hparams, dropout=0.0)).to(device).train()
+trained = []
+for x, y in tasks:
+    model = deepcopy(meta)
+    inner_loop(model, torch.optim.AdamW(model.parameters(), lr=innerstepsize), x, y)
+    trained.append(dict(model.named_parameters()))
+expected = {name: p.detach() + (torch.stack([t[name] for t in trained]).mean(0) - p.detach()) * outerstepsize
+            for name, p in meta.named_parameters()}
+batched = deepcopy(meta)
+BatchedReptile(batched, innerstepsize).run(tasks, innerepochs, outerstepsize)
+diff = max((p - expected[name]).abs().max().item() for name, p in batched.named_parameters())
+print('max |serial mean - batched| after one group of', nb_tasks, 'tasks:', f'{diff:.2e}')
+
+#throughput with dropout on, as in training
+print('device:', device, '\tinnerepochs:', innerepochs)
+model = PureTran_torch(**hparams).to(device).train()
+reptile = FlatReptile(model)
+inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize)
+
+
+def serial_tasks():
+    for task_num, (x, y) in enumerate(tasks):
+        reptile.begin_task()
+        inner_loop(model, inner_optimizer.begin_task(task_num), x, y)
+        reptile.end_task(outerstepsize)
+
+
+_, t_serial = timed(serial_tasks)
+print('serial'.ljust(12), '\ttasks/s:', f'{nb_tasks / t_serial:.2f}')
+
+for group in [3, 9]:
+    model = PureTran_torch(**hparams).to(device).train()
+    batched_reptile = BatchedReptile(model, innerstepsize)
+    _, t_batched = timed(lambda: [batched_reptile.run(tasks[start: start + group], innerepochs, outerstepsize)
+                                  for start in range(0, nb_tasks, group)])
+    print(f'batched K={group}'.ljust(12), '\ttasks/s:', f'{nb_tasks / t_batched:.2f}',
+          '\tspeedup:', f'{t_serial / t_batched:.2f}x')
@@ -0,0 +1,36 @@
+#N-way K-shot test phase of meta_reptile_lopo.py: SerialEvaluator (reload the checkpoint, new AdamW,
+#innerepochs steps, score the target set, per episode) vs EpisodicEvaluator over all episodes at once
+#parity is checked with dropout off: both must reach the same target accuracies
+
+import torch
+from puretran_torch import PureTran_torch
+from episodic_eval import EpisodicEvaluator, SerialEvaluator
+from bench_utils import device, nb_classes, nb_feature, nway_kshot_episodes, puretran_hparams, timed, window_size
+
+hparams = puretran_hparams(nlayers=3)
+innerstepsize_test = 1e-4
+innerepochs = 30
+epoch_test = 20
+K_shot = 1
+target_size = 500
+
+torch.manual_seed(1)
+target_x = torch.randn(target_size, window_size, nb_feature, device=device)
+target_y = torch.randint(0, nb_classes, (target_size,), device=device)
+episodes = nway_kshot_episodes(target_x, target_y, epoch_test, K_shot)
+
+for dropout in [0.0, hparams['dropout']]:
+    model = PureTran_torch(**dict(hparams, dropout=dropout)).to(device)
+    serial = SerialEvaluator(model, innerstepsize_test, innerepochs)
+    evaluator = EpisodicEvaluator(model, innerstepsize_test, innerepochs)
+
+    (serial_accs, _, _), t_serial = timed(lambda: serial.run(episodes, target_x, target_y))
+    (batched_accs, _, _), t_batched = timed(lambda: evaluator.run(episodes, target_x, target_y))
+
+    print('device:', device, '\tdropout:', dropout, '\tepisodes:', epoch_test, '\tinnerepochs:', innerepochs,
+          '\ttarget:', target_size)
+    print('serial'.ljust(10), f'{t_serial:.2f} s', '\tmean test acc:', f'{serial_accs.mean():.4f}')
+    print('batched'.ljust(10), f'{t_batched:.2f} s', '\tmean test acc:', f'{batched_accs.mean():.4f}',
+          '\tspeedup:', f'{t_serial / t_batched:.2f}x')
+    if dropout == 0.0:
+        print('max |serial - batched| per-episode acc:', f'{(serial_accs - batched_accs).abs().max():.4f}')
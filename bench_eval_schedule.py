@@ -0,0 +1,60 @@
+#cost of evaluating after every Reptile task in meta_reptile_lopo.py: one task's inner loop vs validation on
+#the full query and target sets vs a stratified proxy of the query set
+
+import torch
+import torch.nn.functional as F
+from puretran_torch import PureTran_torch
+from reptile import FlatReptile, InnerOptimizer
+from eval_schedule import stratified_subset
+from bench_utils import best_of, device, nb_classes, nb_feature, puretran_hparams, validation, window_size
+
+hparams = puretran_hparams(nlayers=3)
+innerstepsize = 2e-3
+innerepochs = 50
+task_size = 64
+#30% of the source windows of the other subjects, and the target subject
+query_size = 2400
+target_size = 2000
+proxy_size = 256
+repeats = 3
+
+
+torch.manual_seed(1)
+model = PureTran_torch(**hparams).to(device)
+reptile = FlatReptile(model)
+inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize)
+x = torch.randn(task_size, window_size, nb_feature, device=device)
+y = torch.randint(0, nb_classes, (task_size,), device=device)
+quary_x = torch.randn(query_size, window_size, nb_feature, device=device)
+quary_y = torch.randint(0, nb_classes, (query_size,), device=device)
+target_x = torch.randn(target_size, window_size, nb_feature, device=device)
+target_y = torch.randint(0, nb_classes, (target_size,), device=device)
+proxy_idx = torch.tensor(stratified_subset(quary_y.cpu().numpy(), proxy_size)).to(device)
+proxy_x, proxy_y = quary_x[proxy_idx], quary_y[proxy_idx]
+
+
+def task():
+    model.train()
+    reptile.begin_task()
+    optimizer = inner_optimizer.begin_task(0)
+    for _ in range(innerepochs):
+        optimizer.zero_grad()
+        loss = F.cross_entropy(model(x).reshape(-1, nb_classes), y)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
+        optimizer.step()
+    reptile.end_task(0.02)
+
+
+t_task = best_of(task, repeats, warmup=False)
+t_full = best_of(lambda: (validation(model, quary_x, quary_y), validation(model, target_x, target_y)), repeats,
+                 warmup=False)
+t_proxy = best_of(lambda: validation(model, proxy_x, proxy_y), repeats, warmup=False)
+print('device:', device, '\tinnerepochs:', innerepochs, '\tquery:', query_size, '\ttarget:', target_size,
+      '\tproxy:', len(proxy_idx))
+print('inner loop'.ljust(12), f'{t_task * 1e3:.0f} ms')
+print('full eval'.ljust(12), f'{t_full * 1e3:.0f} ms')
+print('proxy eval'.ljust(12), f'{t_proxy * 1e3:.0f} ms')
+for every_tasks in [1, 10]:
+    print(f'every {every_tasks} task(s), full eval:'.ljust(36),
+          f'{t_task + t_full / every_tasks:.2f} s/task', '\tproxy only:', f'{t_task + t_proxy / every_tasks:.2f} s/task')
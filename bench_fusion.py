@@ -0,0 +1,32 @@
+#parity and latency of PureTran_torch.fuse_for_inference against the unfused model
+
+import copy
+import torch
+from puretran_torch import PureTran_torch
+from bench_utils import best_of, device, nb_feature, puretran_hparams, window_size
+
+hparams = puretran_hparams()
+repeat = 20
+
+
+@torch.no_grad()
+def latency(model, x):
+    return best_of(lambda: model(x), repeat)
+
+
+print('device:', device)
+for batch_first in [False, True]:
+    torch.manual_seed(1)
+    model = PureTran_torch(batch_first=batch_first, cls_only=True, **hparams).to(device).eval()
+    fused = copy.deepcopy(model).fuse_for_inference()
+    for batch_size in [1, 64, 1000]:
+        x = torch.randn(batch_size, window_size, nb_feature, device=device)
+        with torch.no_grad():
+            diff = (model(x) - fused(x)).abs().max().item()
+        assert diff < 1e-4, diff
+        t_model = latency(model, x)
+        t_fused = latency(fused, x)
+        print('batch-first' if batch_first else 'seq-first', '\tbatch:', batch_size,
+              '\tmax |unfused - fused|:', f'{diff:.2e}',
+              '\tunfused:', f'{t_model * 1e3:.2f} ms', '\tfused:', f'{t_fused * 1e3:.2f} ms',
+              '\tspeedup:', f'{t_model / t_fused:.2f}x')
@@ -0,0 +1,53 @@
+#test-time adaptation of a checkpoint on N-way K-shot episodes: full fine-tuning (SerialEvaluator and
+#EpisodicEvaluator) vs HeadOnlyEvaluator, which fine-tunes the decoder on cached backbone features
+#the data has a class-dependent offset and the checkpoint is pre-trained on other windows of it, so the
+#accuracies mean something; they are not those of a meta-trained model on real data
+
+import torch
+import torch.nn.functional as F
+from puretran_torch import PureTran_torch
+from episodic_eval import EpisodicEvaluator, HeadOnlyEvaluator, SerialEvaluator
+from bench_utils import (device, nb_classes, nb_feature, nway_kshot_episodes, puretran_hparams, timed, validation,
+                         window_size)
+
+hparams = puretran_hparams(nlayers=3)
+innerstepsize_test = 1e-4
+innerepochs = 30
+epoch_test = 20
+K_shot = 1
+target_size = 500
+pretrain_steps = 100
+
+
+def make_data(n, class_means):
+    y = torch.randint(0, nb_classes, (n,), device=device)
+    return torch.randn(n, window_size, nb_feature, device=device) + class_means[y], y
+
+
+torch.manual_seed(1)
+class_means = torch.randn(nb_classes, 1, nb_feature, device=device) * 0.3
+source_x, source_y = make_data(1024, class_means)
+target_x, target_y = make_data(target_size, class_means)
+episodes = nway_kshot_episodes(target_x, target_y, epoch_test, K_shot)
+
+model = PureTran_torch(**hparams).to(device).train()
+optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+for i in range(pretrain_steps):
+    batch = torch.randint(0, len(source_x), (64,), device=device)
+    optimizer.zero_grad()
+    F.cross_entropy(model(source_x[batch]).reshape(-1, nb_classes), source_y[batch]).backward()
+    optimizer.step()
+state = {name: t.clone() for name, t in model.state_dict().items()}
+print('device:', device, '\tepisodes:', epoch_test, '\tinnerepochs:', innerepochs, '\ttarget:', target_size,
+      '\tcheckpoint acc before adaptation:', f'{validation(model, target_x, target_y):.4f}')
+
+for name, run in [('full serial', lambda: SerialEvaluator(model, innerstepsize_test, innerepochs)
+                   .run(episodes, target_x, target_y)[0]),
+                  ('full batched', lambda: EpisodicEvaluator(model, innerstepsize_test, innerepochs)
+                   .run(episodes, target_x, target_y)[0]),
+                  ('head only', lambda: HeadOnlyEvaluator(model, innerstepsize_test, innerepochs)
+                   .run(episodes, target_x, target_y)[0])]:
+    model.load_state_dict(state)
+    accs, elapsed = timed(run)
+    print(name.ljust(12), f'{elapsed:.2f} s per checkpoint', '\tmean test acc:', f'{accs.mean():.4f}',
+          '\tstd:', f'{accs.std():.4f}')
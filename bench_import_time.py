@@ -0,0 +1,50 @@
+#startup cost of each entry script: time its top-level imports in a fresh interpreter
+#only the import statements are run, so nothing is trained or loaded
+
+import ast
+import os
+import subprocess
+import sys
+import time
+
+scripts = ['meta_reptile_lopo.py', 'tradition_lopo.py', 'meta_reptile_train.py', 'meta_reptile_test.py',
+           'tradition_train_torch.py', 'tradition_test_torch.py', 'gcram_train.py']
+
+#the old all-in-one modules (kept for the TF code) next to the light ones the torch scripts use
+modules = ['functions', 'puretran', 'data_utils', 'puretran_torch']
+
+repeat = 3
+root = os.path.dirname(os.path.abspath(__file__))
+
+
+def top_level_imports(path):
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def time_imports(code):
+    """
+    best wall time of a fresh interpreter running code, and the error if it failed
+    """
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True)
+        elapsed = time.perf_counter() - t0
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        best = elapsed if best is None else min(best, elapsed)
+    return best, None
+
+
+t_python, _ = time_imports('pass')
+print('bare interpreter:', f'{t_python * 1e3:.0f} ms')
+
+for name, code in [(script, top_level_imports(os.path.join(root, script))) for script in scripts] + \
+                  [(module, f'import {module}') for module in modules]:
+    elapsed, error = time_imports(code)
+    if error is None:
+        print(name.ljust(26), f'{elapsed * 1e3:8.0f} ms')
+    else:
+        print(name.ljust(26), '  failed:', error)
@@ -0,0 +1,58 @@
+#scaling of ParallelReptile from 1 to N worker processes, against the serial loop on one thread
+
+import os
+import time
+import numpy as np
+import torch
+import torch.nn.functional as F
+from puretran_torch import PureTran_torch
+from reptile import FlatReptile, InnerOptimizer
+from reptile_parallel import ParallelReptile
+from bench_utils import nb_classes, nb_feature, puretran_hparams, window_size
+
+hparams = puretran_hparams()
+innerstepsize = 2e-3
+outerstepsize = 0.02
+innerepochs = 5
+nb_tasks = 9
+task_size = 64
+epochs = 2
+max_staleness = None
+
+if __name__ == '__main__':
+    torch.manual_seed(1)
+    tasks = [(torch.randn(task_size, window_size, nb_feature), torch.randint(0, nb_classes, (task_size,)))
+             for _ in range(nb_tasks)]
+    task_order = np.concatenate([np.random.permutation(nb_tasks) for _ in range(epochs)])
+
+    torch.set_num_threads(1)
+    model = PureTran_torch(**hparams).train()
+    reptile = FlatReptile(model)
+    inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize)
+    t0 = time.perf_counter()
+    for task_num in task_order:
+        x, y = tasks[task_num]
+        reptile.begin_task()
+        optimizer = inner_optimizer.begin_task(task_num)
+        for _ in range(innerepochs):
+            optimizer.zero_grad()
+            loss = F.cross_entropy(model(x).reshape(-1, nb_classes), y)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
+            optimizer.step()
+        reptile.end_task(outerstepsize)
+    t_serial = time.perf_counter() - t0
+    print('cpus:', os.cpu_count(), '\ttasks:', len(task_order), '\tinnerepochs:', innerepochs)
+    print('serial'.ljust(10), '\ttasks/s:', f'{len(task_order) / t_serial:.2f}')
+
+    for nb_workers in sorted({1, 2, os.cpu_count() or 1}):
+        model = PureTran_torch(**hparams).train()
+        parallel = ParallelReptile(model, FlatReptile(model), tasks, nb_workers, innerepochs, innerstepsize,
+                                   max_staleness)
+        t0 = time.perf_counter()
+        staleness = [s for _, s, _, _ in parallel.run(task_order, outerstepsize)]
+        elapsed = time.perf_counter() - t0
+        parallel.close()
+        print(f'workers={nb_workers}'.ljust(10), '\ttasks/s:', f'{len(task_order) / elapsed:.2f}',
+              '\tspeedup:', f'{t_serial / elapsed:.2f}x', '\tmean staleness:', f'{np.mean(staleness):.2f}',
+              '\tmax staleness:', max(staleness))
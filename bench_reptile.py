@@ -0,0 +1,107 @@
+#per-task overhead of Reptile:
+#the meta-update (state_dict deepcopy + load_state_dict vs FlatReptile), timed with the inner loop replaced
+#by one in-place change of the weights, and the inner optimizer (new AdamW per task vs InnerOptimizer)
+
+from copy import deepcopy
+import torch
+import torch.nn.functional as F
+from puretran_torch import PureTran_torch
+from reptile import FlatReptile, InnerOptimizer
+from bench_utils import device, puretran_hparams, timed
+
+hparams = puretran_hparams(nlayers=3)
+outerstepsize = 0.02
+nb_tasks = 200
+
+
+@torch.no_grad()
+def fake_inner_loop(model):
+    for p in model.parameters():
+        p.add_(1e-3)
+
+
+def state_dict_path(model):
+    weights_before = deepcopy(model.state_dict())
+    fake_inner_loop(model)
+    weights_after = model.state_dict()
+    model.load_state_dict({name:
+                           weights_before[name] + (weights_after[name] -
+                                                   weights_before[name]) * outerstepsize
+                           for name in weights_before})
+
+
+def flat_path(model, reptile):
+    reptile.begin_task()
+    fake_inner_loop(model)
+    reptile.end_task(outerstepsize)
+
+
+torch.manual_seed(1)
+model = PureTran_torch(**hparams).to(device)
+flat_model = deepcopy(model)
+reptile = FlatReptile(flat_model)
+
+for name, run in [('state_dict', lambda: state_dict_path(model)), ('flat', lambda: flat_path(flat_model, reptile)),
+                  ('inner only', lambda: fake_inner_loop(flat_model))]:
+    run()
+    _, elapsed = timed(lambda: [run() for _ in range(nb_tasks)])
+    t_task = elapsed / nb_tasks
+    print(name.ljust(10), '\tper task:', f'{t_task * 1e3:.3f} ms')
+
+#both updates agree up to float rounding
+a = PureTran_torch(**hparams).to(device)
+b = deepcopy(a)
+reptile = FlatReptile(b)
+for _ in range(10):
+    state_dict_path(a)
+    flat_path(b, reptile)
+diff = max((p - q).abs().max().item() for p, q in zip(a.parameters(), b.parameters()))
+print('device:', device, '\tparameters:', reptile.flat.numel(), '\tmax |state_dict - flat| after 10 tasks:', f'{diff:.2e}')
+
+
+#inner optimizer: a new AdamW per task vs one InnerOptimizer, timed on fixed gradients so only the
+#optimizer (construction, state allocation or reset, steps) is measured
+innerepochs = 50
+innerstepsize = 2e-3
+nb_tasks = 20
+
+
+def optimizer_for(name, model, optimizers, task):
+    if name == 'new AdamW':
+        return torch.optim.AdamW(model.parameters(), lr=innerstepsize)
+    return optimizers[name].begin_task(task % 4)
+
+
+def optimizer_steps(name, model, optimizers, task):
+    optimizer = optimizer_for(name, model, optimizers, task)
+    for _ in range(innerepochs):
+        optimizer.step()
+
+
+torch.manual_seed(1)
+models = {name: deepcopy(a) for name in ['new AdamW', 'reset', 'per_task']}
+optimizers = {'reset': InnerOptimizer(models['reset'].parameters(), innerstepsize),
+              'per_task': InnerOptimizer(models['per_task'].parameters(), innerstepsize, per_task=True)}
+print()
+for name, model in models.items():
+    for p in model.parameters():
+        p.grad = torch.randn_like(p)
+    times = [timed(lambda: optimizer_steps(name, model, optimizers, task))[1] for task in range(nb_tasks)]
+    print(name.ljust(10), '	optimizer per task (' + str(innerepochs), 'steps):', f'{min(times[1:]) * 1e3:.1f} ms')
+
+#with real inner loops, a reset InnerOptimizer follows the same trajectory as a new AdamW per task
+x = torch.randn(8, hparams['height'], hparams['nb_features'], device=device)
+y = torch.randint(0, hparams['ntoken'], (8,), device=device)
+models = {name: deepcopy(a).train() for name in ['new AdamW', 'reset']}
+optimizers = {'reset': InnerOptimizer(models['reset'].parameters(), innerstepsize)}
+for name, model in models.items():
+    for task in range(3):
+        optimizer = optimizer_for(name, model, optimizers, task)
+        torch.manual_seed(task)
+        for _ in range(3):
+            optimizer.zero_grad()
+            loss = F.cross_entropy(model(x).reshape(-1, hparams['ntoken']), y)
+            loss.backward()
+            optimizer.step()
+diff = max((p - q).abs().max().item() for p, q in zip(models['new AdamW'].parameters(), models['reset'].parameters()))
+print('max |new AdamW - reset| after 3 tasks:', f'{diff:.2e}')
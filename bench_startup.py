@@ -0,0 +1,61 @@
+#startup and first-inference latency: rebuilding PureTran_torch + state_dict vs loading an export_scripted file
+#each path runs in a fresh interpreter, as a serving process would
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import torch
+from puretran_torch import PureTran_torch, export_scripted
+from bench_utils import nb_feature, puretran_hparams, window_size
+
+hparams = puretran_hparams(pe=False, cls_only=True)
+batch_size = 100
+repeat = 3
+root = os.path.dirname(os.path.abspath(__file__))
+
+#every child prints the seconds spent importing, loading and on the first forward
+timed = '''
+import time, json
+t0 = time.perf_counter()
+{imports}
+t1 = time.perf_counter()
+{load}
+t2 = time.perf_counter()
+with torch.no_grad():
+    model(torch.zeros({batch_size}, {window_size}, {nb_feature}))
+t3 = time.perf_counter()
+print(json.dumps([t1 - t0, t2 - t1, t3 - t2]))
+'''
+
+paths = {
+    'state_dict': ('import torch\nfrom puretran_torch import PureTran_torch',
+                   'model = PureTran_torch(**{hparams})\n'
+                   'model.load_state_dict(torch.load({state_fn!r}))\n'
+                   'model.eval()'),
+    'scripted': ('import torch\nfrom scripted_model import load_scripted, score',
+                 'scripted, hparams = load_scripted({scripted_fn!r})\n'
+                 'model = lambda x: score(scripted, x)'),
+}
+
+
+def run(imports, load):
+    code = timed.format(imports=imports, load=load, batch_size=batch_size, window_size=window_size,
+                        nb_feature=nb_feature)
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    state_fn = os.path.join(tmp, 'model.pth')
+    scripted_fn = os.path.join(tmp, 'model.pt')
+    model = PureTran_torch(**hparams).eval()
+    torch.save(model.state_dict(), state_fn)
+    export_scripted(model, scripted_fn)
+
+    for name, (imports, load) in paths.items():
+        load = load.format(hparams=hparams, state_fn=state_fn, scripted_fn=scripted_fn)
+        best = min((run(imports, load) for _ in range(repeat)), key=sum)
+        print(name.ljust(12), '\timport:', f'{best[0] * 1e3:7.0f} ms', '\tload:', f'{best[1] * 1e3:6.1f} ms',
+              '\tfirst inference:', f'{best[2] * 1e3:6.1f} ms', '\ttotal:', f'{sum(best) * 1e3:7.0f} ms')
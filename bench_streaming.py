@@ -0,0 +1,51 @@
+#live-stream scoring: StreamingPureTran (each sample projected once) vs windowing the raw samples and
+#running the full model on every window
+
+import numpy as np
+import torch
+from act_stream import ActStreamWindower
+from bench_windowing import make_recording
+from puretran_torch import PureTran_torch, StreamingPureTran
+from bench_utils import nb_classes, nb_feature, puretran_hparams, timed, window_size
+
+step = 10
+hparams = puretran_hparams(batch_first=True, cls_only=True)
+#samples per push, as a sensor would deliver them
+chunk = step
+
+torch.manual_seed(1)
+model = PureTran_torch(**hparams).eval().fuse_for_inference()
+data = make_recording(1, nb_classes=nb_classes, nb_feature=nb_feature, run_length=3000, runs_per_subject=4)
+features = data[:, :-2].astype(np.float32)
+labels, subjects = data[:, -2], data[:, -1]
+
+
+@torch.no_grad()
+def raw_windows():
+    windower = ActStreamWindower(nb_feature, window_size, step)
+    logits = []
+    for i in range(0, len(features), chunk):
+        windows = [window for window, y, u in
+                   windower.push(features[i: i + chunk], labels[i: i + chunk], subjects[i: i + chunk])]
+        if windows:
+            logits.append(model(torch.from_numpy(np.stack(windows))).reshape(len(windows), -1))
+    return torch.cat(logits)
+
+
+def streaming():
+    session = StreamingPureTran(model, step)
+    logits = [session.push(features[i: i + chunk], labels[i: i + chunk], subjects[i: i + chunk])[0]
+              for i in range(0, len(features), chunk)]
+    return torch.cat(logits)
+
+
+results = {}
+for name, fn in [('raw windows', raw_windows), ('streaming', streaming)]:
+    results[name], elapsed = timed(fn)
+    print(name.ljust(12), '\twindows:', len(results[name]), '\ttime:', f'{elapsed * 1e3:.0f} ms',
+          '\tper sample:', f'{elapsed / len(features) * 1e6:.1f} us')
+
+print('max |raw - streaming|:', f'{(results["raw windows"] - results["streaming"]).abs().max().item():.2e}')
+#the saving is in the input projection, the encoder layers after it cost the same in both paths
+print('rows through model.encoder: raw windows', len(results['raw windows']) * window_size,
+      '\tstreaming', len(features))
@@ -0,0 +1,67 @@
+#setup shared by the torch benchmarks: the PureTran_torch they time, the device and the timing helpers
+
+import time
+import torch
+import torch.nn.functional as F
+
+window_size = 20
+nb_feature = 23
+nb_classes = 6
+device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def puretran_hparams(**overrides):
+    """
+    PureTran_torch keyword arguments: the scripts' model with 2 layers, overrides replace or add arguments
+    """
+    hparams = dict(height=window_size, nb_features=nb_feature, ntoken=nb_classes, ninp=120, nhead=3, nhid=2048,
+                   nlayers=2, pe=True, dropout=0.1)
+    hparams.update(overrides)
+    return hparams
+
+
+@torch.no_grad()
+def validation(model, quary_x, quary_y):
+    """
+    accuracy of model on a query set, as the validation of the training scripts computes it
+    """
+    model.eval()
+    outputs = F.softmax(model(quary_x), dim=2).argmax(2).reshape(-1)
+    return (outputs == quary_y).float().mean().item()
+
+
+def nway_kshot_episodes(target_x, target_y, nb_episodes, K_shot):
+    """
+    nb_episodes (support_x, support_y) sets of K_shot random windows of every class of the target set
+    """
+    episodes = []
+    for _ in range(nb_episodes):
+        idx = torch.cat([torch.nonzero(target_y == c).flatten()[torch.randperm(int((target_y == c).sum()))[:K_shot]]
+                         for c in range(nb_classes)])
+        episodes.append((target_x[idx], target_y[idx]))
+    return episodes
+
+
+def sync():
+    if device == 'cuda':
+        torch.cuda.synchronize()
+
+
+def timed(run):
+    """
+    run() and its wall time in seconds, with the device synchronized before and after
+    """
+    sync()
+    t0 = time.perf_counter()
+    result = run()
+    sync()
+    return result, time.perf_counter() - t0
+
+
+def best_of(run, repeat, warmup=True):
+    """
+    the fastest of repeat timed calls of run(), after one untimed call with warmup
+    """
+    if warmup:
+        run()
+    return min(timed(run)[1] for _ in range(repeat))
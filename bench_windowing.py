@@ -0,0 +1,76 @@
+#benchmark the run-length windowing engine of get_act_time_sequences against the old per-window loop
+
+import time
+import numpy as np
+from data_utils import get_act_time_sequences, get_act_window_blocks
+
+
+#the per-window loop get_act_time_sequences used before, kept here as the reference
+def get_act_time_sequences_loop(input_data, window_size, step):
+
+    output_X = []
+    output_y = []
+    output_u = []
+    start = 0
+    y = input_data[start][-2]
+    u = input_data[start][-1]
+    while (start + window_size - 1) < (input_data.shape[0]):
+        end = start + window_size - 1
+
+        #either y or u change, update its value
+        if input_data[end][-2] != y or input_data[end][-1] != u:
+            y = input_data[end][-2]
+            u = input_data[end][-1]
+            for i in range(end, 0, -1):
+                if input_data[i][-2] != y or input_data[i][-1] != u:
+                    start = i + 1
+                    break
+        else:
+            output_X.append(input_data[start: end + 1, :-2])
+            output_y.append(y)
+            output_u.append(u)
+            start = start + step
+    return np.array(output_X), np.array(output_y), np.array(output_u)
+
+
+#synthetic recording shaped like MHEALTH: every subject does each activity in a few long runs
+def make_recording(nb_subjects, nb_classes, nb_feature, run_length, runs_per_subject, seed=1):
+    rng = np.random.RandomState(seed)
+    rows = []
+    for sub in range(nb_subjects):
+        lengths = rng.randint(run_length // 2, run_length * 2, size=runs_per_subject)
+        labels = np.repeat(rng.randint(0, nb_classes, size=runs_per_subject), lengths)
+        features = rng.randn(labels.shape[0], nb_feature)
+        rows.append(np.column_stack([features, labels, np.full(labels.shape[0], sub)]))
+    return np.concatenate(rows)
+
+
+def best_of(fn, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+if __name__ == '__main__':
+    window_size = 20
+    step = 10
+    repeat = 3
+
+    for nb_subjects in [2, 5, 10]:
+        data = make_recording(nb_subjects, nb_classes=6, nb_feature=23, run_length=3000, runs_per_subject=12)
+
+        t_loop, expected = best_of(get_act_time_sequences_loop, repeat, data, window_size, step)
+        t_runs, got = best_of(get_act_time_sequences, repeat, data, window_size, step)
+        #finding the windows alone, without copying them out
+        t_blocks, _ = best_of(get_act_window_blocks, repeat, data[:, -2], data[:, -1], window_size, step)
+
+        for a, b in zip(expected, got):
+            assert a.dtype == b.dtype and a.shape == b.shape and np.array_equal(a, b)
+
+        print('subjects:', nb_subjects, '\trows:', data.shape[0], '\twindows:', got[0].shape[0],
+              '\tloop:', f'{t_loop * 1e3:.1f} ms', '\truns:', f'{t_runs * 1e3:.1f} ms',
+              '(search', f'{t_blocks * 1e3:.2f} ms)',
+              '\tspeedup:', f'{t_loop / t_runs:.1f}x')
@@ -0,0 +1,299 @@
+#numpy data utilities: shuffling, subject selection and windowing of activity and EEG data
+#no deep learning framework is imported here, the torch scripts only need this module
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+def seed_shuffle(input, seed=1):
+    np.random.seed(seed)
+    np.random.shuffle(input)
+    return input
+
+def shuffled_prefix(arrays, size=None, seed=1):
+    """
+    first size rows of every array after one shared shuffle, the arrays themselves are not moved
+    seed is an int or a local np.random.Generator/RandomState, the global RNG is never touched
+    an int seed gives the same rows as seed_shuffle(array, seed), but unlike seed_shuffle it does not
+    seed the global RNG: later np.random calls are unseeded, draw from a local RNG where the order matters
+    """
+    if isinstance(seed, (np.random.Generator, np.random.RandomState)):
+        rng = seed
+    else:
+        rng = np.random.RandomState(seed)
+    index = rng.permutation(len(arrays[0]))[:size]
+    return tuple(array[index] for array in arrays)
+
+def empty_append_row(a, b):
+    if type(a) is np.ndarray and type(b) is np.ndarray:
+        return np.append(a, b, axis=0)
+    return a or b
+
+def compact_int(column):
+    """
+    integer-valued column in the smallest of int8/int16/int32 that holds it
+    """
+    values = column.astype(np.int64)
+    if not np.array_equal(values, column):
+        raise ValueError('column holds non-integer values')
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values
+
+
+class ActColumns(object):
+    """
+    columnar form of a raw activity matrix [#sample:nb_feature + 2]
+    features: contiguous float32 [#sample:nb_feature], labels and subjects: compact ints
+    accepted by get_act_data, get_act_time_sequences, SubjectIndex and SubjectWindows in place of the matrix
+    """
+
+    def __init__(self, features, labels, subjects):
+        self.features = features
+        self.labels = labels
+        self.subjects = subjects
+
+    def __len__(self):
+        return self.labels.shape[0]
+
+    def __getitem__(self, rows):
+        return ActColumns(self.features[rows], self.labels[rows], self.subjects[rows])
+
+    @staticmethod
+    def concatenate(parts):
+        return ActColumns(np.concatenate([part.features for part in parts]),
+                          np.concatenate([part.labels for part in parts]),
+                          np.concatenate([part.subjects for part in parts]))
+
+
+def split_act_columns(input_data):
+    return ActColumns(np.ascontiguousarray(input_data[:, :-2], dtype=np.float32),
+                      compact_int(input_data[:, -2]), compact_int(input_data[:, -1]))
+
+
+def act_columns(input_data):
+    """
+    (features, labels, subjects) of a raw matrix or an ActColumns
+    """
+    if isinstance(input_data, ActColumns):
+        return input_data.features, input_data.labels, input_data.subjects
+    return input_data[:, :-2], input_data[:, -2], input_data[:, -1]
+
+
+class SubjectIndex(object):
+    """
+    rows of every subject in a loaded matrix, built once with a stable argsort on the subject column
+    """
+
+    def __init__(self, input_data):
+        self.input_data = input_data
+        _, _, subjects = act_columns(input_data)
+        self.order = np.argsort(subjects, kind='stable')
+        self.subjects, offsets = np.unique(subjects[self.order], return_index=True)
+        self.offsets = np.append(offsets, subjects.shape[0])
+
+    def rows(self, i):
+        """
+        rows of subject i in the original order, as a slice when they are contiguous
+        """
+        k = np.searchsorted(self.subjects, i)
+        if k == self.subjects.shape[0] or self.subjects[k] != i:
+            return slice(0, 0)
+        rows = self.order[self.offsets[k]: self.offsets[k + 1]]
+        if rows[-1] - rows[0] == rows.shape[0] - 1:
+            return slice(rows[0], rows[-1] + 1)
+        return rows
+
+    def take(self, sub_range):
+        parts = [self.input_data[self.rows(i)] for i in sub_range]
+        if isinstance(self.input_data, ActColumns):
+            return ActColumns.concatenate(parts)
+        return np.concatenate(parts)
+
+
+def get_act_data(input_data, sub_range, index=None):
+    """
+    rows of the subjects in sub_range, in that order
+    pass the SubjectIndex of input_data to avoid rebuilding it on every call
+    """
+    if len(sub_range) == 0:
+        return None
+    if index is None:
+        index = SubjectIndex(input_data)
+    return index.take(sub_range)
+
+def get_act_runs(labels, subjects):
+    """
+    split the label/subject columns into runs of constant (y, u)
+    returns run starts and (exclusive) run ends
+    """
+    change = np.flatnonzero((labels[1:] != labels[:-1]) | (subjects[1:] != subjects[:-1])) + 1
+    run_starts = np.concatenate(([0], change))
+    run_ends = np.append(change, labels.shape[0])
+    return run_starts, run_ends
+
+
+def get_act_window_blocks(labels, subjects, window_size, step):
+    """
+    find the windows emitted by get_act_time_sequences, one block per run
+    returns a list of (first_start, nb_windows, y, u); the windows of a block start at
+    first_start, first_start + step, ... and all carry the same y and u
+    """
+    nb_samples = labels.shape[0]
+    if nb_samples < window_size:
+        #also covers the empty rows of a subject missing from the matrix
+        return []
+    run_starts, run_ends = get_act_runs(labels, subjects)
+
+    blocks = []
+    start = 0
+    y = labels[start]
+    u = subjects[start]
+    while (start + window_size - 1) < nb_samples:
+        end = start + window_size - 1
+        run = np.searchsorted(run_starts, end, side='right') - 1
+
+        #either y or u change, jump to the start of the run holding end
+        if labels[end] != y or subjects[end] != u:
+            y = labels[end]
+            u = subjects[end]
+            # the backward scan never looks at row 0, so a run starting at 1 keeps start
+            if run_starts[run] > 1:
+                start = run_starts[run]
+        else:
+            # every window ending inside this run matches as well
+            nb_windows = (run_ends[run] - window_size - start) // step + 1
+            blocks.append((start, nb_windows, y, u))
+            start = start + nb_windows * step
+    return blocks
+
+
+def get_act_block_view(features, first, nb_windows, window_size, step):
+    """
+    read-only [nb_windows:window_size:nb_feature] view of one block, no data is copied
+    """
+    row_stride, col_stride = features.strides
+    return as_strided(features[first:], shape=(nb_windows, window_size, features.shape[1]),
+                      strides=(step * row_stride, row_stride, col_stride), writeable=False)
+
+
+class ActWindows(object):
+    """
+    windows kept as their first row in the raw matrix, nothing is copied until a batch is taken,
+    whose rows are then gathered from the matrix and cast to dtype
+    """
+
+    def __init__(self, features, starts, window_size, dtype=np.float32):
+        self.features = features
+        self.starts = starts
+        self.window_size = window_size
+        self.dtype = dtype
+        self.shape = (starts.shape[0], window_size, features.shape[1])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        #a scalar index gives one [window_size:nb_feature] window, as it does on the copied array
+        rows = np.add.outer(self.starts[index], np.arange(self.window_size))
+        return self.features[rows].astype(self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        output = self[:]
+        return output if dtype is None else output.astype(dtype)
+
+
+def get_act_time_sequences(input_data, window_size, step, as_view=False):
+    """
+    input_data is a raw matrix or its ActColumns
+    with as_view, X is an ActWindows over input_data instead of a [#window:window_size:nb_feature] copy
+    """
+
+    features, labels, subjects = act_columns(input_data)
+    blocks = get_act_window_blocks(labels, subjects, window_size, step)
+    if not blocks and not as_view:
+        return np.array([]), np.array([]), np.array([])
+
+    output_y = np.concatenate([np.full(nb, y) for _, nb, y, _ in blocks] + [labels[:0]])
+    output_u = np.concatenate([np.full(nb, u) for _, nb, _, u in blocks] + [subjects[:0]])
+    if as_view:
+        starts = np.concatenate([first + step * np.arange(nb) for first, nb, _, _ in blocks] + [np.arange(0)])
+        return ActWindows(features, starts, window_size), output_y, output_u
+
+    output_X = np.concatenate([get_act_block_view(features, first, nb, window_size, step)
+                               for first, nb, _, _ in blocks])
+    return output_X, output_y, output_u
+
+
+class SubjectWindows(object):
+    """
+    windows of each subject, computed once; a fold is the per-subject blocks concatenated in sub_range order
+    this is not always what windowing get_act_data(sub_range) gives: that scan carries its position over
+    from the previous subject and only checks each window's last row, so it can skip (or shift the windows
+    of) short runs at the start of a subject, depending on which subject came before; here every subject
+    is windowed from its own first row, so its windows are the same in every fold
+    """
+
+    def __init__(self, windows):
+        # subject -> (X, y, u)
+        self.windows = windows
+
+    @classmethod
+    def from_data(cls, input_data, window_size, step, index=None):
+        if index is None:
+            index = SubjectIndex(input_data)
+        return cls({i: get_act_time_sequences(input_data[index.rows(i)], window_size, step)
+                    for i in index.subjects})
+
+    def fold(self, sub_range):
+        parts = [self.windows[i] for i in sub_range if i in self.windows and len(self.windows[i][0])]
+        if not parts:
+            return np.array([]), np.array([]), np.array([])
+        return tuple(np.concatenate([part[k] for part in parts]) for k in range(3))
+
+    def leave_one_out(self, target_id, sub_range):
+        """
+        (source, target) windows with target_id held out of sub_range
+        """
+        return self.fold([i for i in sub_range if i != target_id]), self.fold([target_id])
+
+
+"""
+Time Window
+"""
+
+
+def windows(data, size, step):
+
+    start = 0
+    while (start + size) <= data.shape[0]:
+        yield int(start), int(start + size)
+        start += step
+
+
+def segment_signal_without_transition(data, window_size, step, as_view=False):
+
+    """
+    [#window:window_size:...] windows along the first axis of data, one strided pass
+    as_view returns a read-only view over data, otherwise a contiguous copy
+    """
+
+    if data.shape[0] < window_size:
+        return np.array([])
+    #read-only [#window:window_size:...] view over data, nothing is copied
+    segments = np.moveaxis(sliding_window_view(data, window_size, axis=0)[::step], -1, 1)
+    return segments if as_view else np.ascontiguousarray(segments)
+
+
+def segment_dataset(X, window_size, step, as_view=False):
+
+    """
+    segment_signal_without_transition of every X[i], for all trials at once
+    shape: [#trial:#window:window_size:...]
+    """
+
+    if X.shape[1] < window_size:
+        return np.empty((X.shape[0], 0))
+    win_x = np.moveaxis(sliding_window_view(X, window_size, axis=1)[:, ::step], -1, 2)
+    return win_x if as_view else np.ascontiguousarray(win_x)
@@ -0,0 +1,133 @@
+#offline EEG loading: local EDF files, one process per subject, epochs cached on disk per (subject, event_codes)
+#mne is only imported by workers that actually have to read EDF files, a warm cache never touches it
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+default_data_dir = './eegmmidb'
+default_cache_dir = './eeg_cache'
+
+#bump when the epoching changes so old entries are not reused
+cache_version = 1
+
+
+def edf_path(data_dir, sub_id, run):
+    """
+    physionet eegmmidb layout, e.g. S001/S001R04.edf (what mne.datasets.eegbci.load_data downloads)
+    """
+    return os.path.join(data_dir, f'S{sub_id:03d}', f'S{sub_id:03d}R{run:02d}.edf')
+
+
+def subject_paths(data_dir, sub_id, event_codes):
+    paths = [edf_path(data_dir, sub_id, run) for run in event_codes]
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'{path} not found, fetch it once with '
+                                    f'mne.datasets.eegbci.load_data({sub_id}, {list(event_codes)})')
+    return paths
+
+
+def epoch_eeg_runs(paths):
+    """
+    read and concatenate the EDF runs, then epoch them into left/right trials
+    shape: [#trial:64:time_length]
+    """
+    import mne
+    from mne.io import concatenate_raws
+
+    parts = [mne.io.read_raw_edf(path, preload=True, stim_channel='auto')
+             for path in paths]
+
+    raw = concatenate_raws(parts)
+
+    # add filter
+    # raw.filter(4., 30., fir_design='firwin', skip_by_annotation='edge')
+
+    picks = mne.pick_types(raw.info, meg=False, eeg=True, stim=False, eog=False,
+                           exclude='bads')
+    events = mne.find_events(raw, shortest_event=0, stim_channel='STI 014')
+    epoched = mne.Epochs(raw, events, dict(left=2, right=3), tmin=1, tmax=4.1, proj=False, picks=picks,
+                         baseline=None, preload=True)
+    X = (epoched.get_data() * 1e6).astype(np.float32)  #fetures, shape: [#trial:64:time_length]
+    y = (epoched.events[:, 2] - 2).astype(int)  #label: rest:1, left: 2, right:3, minus two to get labels 0, 1
+
+    return X, y
+
+
+def get_eeg_data(event_codes, sub_list):
+
+    """
+    get EEG data
+    sub 88, 89, 92, 100 have wrong data
+    event_codes = [4, 8, 12]  # imagine opening and closing left or right fist
+    event_codes = [3, 7, 11]  # really opening and closing left or right fist
+    shape: [#trial:64:time_length]
+    see
+    https://www.physionet.org/pn4/eegmmidb/
+    """
+
+    import mne
+
+    physionet_paths = [mne.datasets.eegbci.load_data(sub_id, event_codes) for sub_id in sub_list]
+    physionet_paths = np.concatenate(physionet_paths)
+    return epoch_eeg_runs(physionet_paths)
+
+
+def cache_key(paths, sub_id, event_codes):
+    params = {'sub_id': int(sub_id),
+              'event_codes': [int(i) for i in event_codes],
+              'sources': [[os.path.basename(path), os.stat(path).st_size, os.stat(path).st_mtime_ns]
+                          for path in paths],
+              'version': cache_version}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _entry_dir(cache_dir, data_dir, sub_id, event_codes):
+    paths = subject_paths(data_dir, sub_id, event_codes)
+    return os.path.join(cache_dir, f'S{sub_id:03d}_' + cache_key(paths, sub_id, event_codes)), paths
+
+
+def _build_entry(entry_dir, paths):
+    X, y = epoch_eeg_runs(paths)
+    tmp_dir = f'{entry_dir}.tmp{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, 'X.npy'), X)
+    np.save(os.path.join(tmp_dir, 'y.npy'), y)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # another process stored the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_eeg_data(event_codes, sub_list, data_dir=default_data_dir, cache_dir=default_cache_dir,
+                  n_jobs=None):
+    """
+    get_eeg_data without the network: epochs every subject of sub_list from data_dir,
+    subjects missing from the cache are read in a pool of n_jobs processes (default: one per cpu)
+    trials come out in sub_list order, each subject epoched on its own
+    """
+    entries = [_entry_dir(cache_dir, data_dir, sub_id, event_codes) for sub_id in sub_list]
+    missing = {entry_dir: paths for entry_dir, paths in entries if not os.path.isdir(entry_dir)}
+
+    if missing:
+        os.makedirs(cache_dir, exist_ok=True)
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(missing))
+        if n_jobs == 1:
+            for entry_dir, paths in missing.items():
+                _build_entry(entry_dir, paths)
+        else:
+            with ProcessPoolExecutor(n_jobs) as pool:
+                list(pool.map(_build_entry, missing.keys(), missing.values()))
+
+    parts = [(np.load(os.path.join(entry_dir, 'X.npy')),
+              np.load(os.path.join(entry_dir, 'y.npy'))) for entry_dir, _ in entries]
+    return np.concatenate([X for X, _ in parts]), np.concatenate([y for _, y in parts])
+
+
+def clear_cache(cache_dir=default_cache_dir):
+    shutil.rmtree(cache_dir, ignore_errors=True)
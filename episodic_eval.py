@@ -0,0 +1,129 @@
+#N-way K-shot evaluation of a meta-trained checkpoint: one episode at a time, many at once, or the decoder alone
+
+import copy
+import torch
+import torch.nn.functional as F
+from reptile import BatchedReptile
+
+
+class SerialEvaluator(object):
+    """
+    the test loop: for each episode, model is reset to its weights at the start of run(), adapted on the
+    support set with a new AdamW (clip_grad_norm_ per step) and scored on the target set; only one copy of
+    the model is ever in memory, model is left with its starting weights
+    """
+
+    def __init__(self, model, lr, innerepochs, max_grad_norm=2.0):
+        self.model = model
+        self.lr = lr
+        self.innerepochs = innerepochs
+        self.max_grad_norm = max_grad_norm
+
+    def run(self, episodes, target_x, target_y):
+        """
+        episodes: list of (support_x, support_y) tensors
+        returns the [episode] accuracies on the target set and the [innerepochs:episode] losses and
+        accuracies of the adaptation steps
+        """
+        state = copy.deepcopy(self.model.state_dict())
+        test_accs, losses, accs = [], [], []
+        for x, y in episodes:
+            self.model.load_state_dict(state)
+            optimizer = torch.optim.AdamW(self.model.parameters(), lr=self.lr)
+            self.model.train()
+            episode_losses, episode_accs = [], []
+            for _ in range(self.innerepochs):
+                optimizer.zero_grad()
+                outputs = self.model(x).reshape(len(y), -1).float()
+                loss = F.cross_entropy(outputs, y)
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(self.model.parameters(), self.max_grad_norm)
+                optimizer.step()
+                episode_losses.append(loss.detach())
+                episode_accs.append((outputs.argmax(1) == y).float().mean())
+            self.model.eval()
+            with torch.no_grad():
+                predictions = self.model(target_x).argmax(-1).reshape(-1)
+            test_accs.append((predictions == target_y).float().mean())
+            losses.append(torch.stack(episode_losses))
+            accs.append(torch.stack(episode_accs))
+        self.model.load_state_dict(state)
+        return torch.stack(test_accs), torch.stack(losses, 1), torch.stack(accs, 1)
+
+
+class EpisodicEvaluator(object):
+    """
+    adapts one copy of model's weights per episode on that episode's support set, all copies at the same
+    time with BatchedReptile's vmapped inner loop (the AdamW steps of SerialEvaluator), then scores the
+    adapted copies on the whole target set, chunk_size copies per vmapped pass; model itself is not changed
+    seq-first, every copy scoring at once holds a [nhead:target:target] attention per layer (about 1 GB in
+    fp32 for 2000 target windows), so keep chunk_size small; on CPU, where vmap runs attention one copy at
+    a time, this is slower than SerialEvaluator
+    """
+
+    def __init__(self, model, lr, innerepochs, max_grad_norm=2.0, chunk_size=2):
+        self.model = model
+        self.innerepochs = innerepochs
+        self.adapter = BatchedReptile(model, lr, max_grad_norm)
+        self.buffers = dict(model.named_buffers())
+        self.predict = torch.func.vmap(self._predict, in_dims=(0, None), chunk_size=chunk_size)
+
+    def _predict(self, params, x):
+        outputs = torch.func.functional_call(self.model, (params, self.buffers), (x,))
+        return outputs.argmax(-1).reshape(-1)
+
+    def run(self, episodes, target_x, target_y):
+        """
+        episodes: list of (support_x, support_y) tensors
+        returns the [episode] accuracies on the target set and the [innerepochs:episode] losses and
+        accuracies of the adaptation steps
+        """
+        self.model.train()
+        params, losses, accs = self.adapter.adapt(episodes, self.innerepochs)
+        self.model.eval()
+        with torch.no_grad():
+            predictions = self.predict(params, target_x)
+        return (predictions == target_y).float().mean(1), losses, accs
+
+
+class HeadOnlyEvaluator(object):
+    """
+    the same evaluation adapting model.decoder alone: everything before it (encoder, pe, transformer_encoder)
+    stays as in the checkpoint, so the support and target features are computed once, in eval mode, and
+    each episode fine-tunes a copy of the decoder on its cached support features (AdamW, clip_grad_norm_)
+    run() returns what SerialEvaluator.run does
+    """
+
+    def __init__(self, model, lr, innerepochs, max_grad_norm=2.0):
+        self.model = model
+        self.lr = lr
+        self.innerepochs = innerepochs
+        self.max_grad_norm = max_grad_norm
+
+    def run(self, episodes, target_x, target_y):
+        self.model.eval()
+        with torch.no_grad():
+            #seq-first samples attend to each other, each support set is encoded on its own
+            support = [(self.model.features(x), y) for x, y in episodes]
+            target_features = self.model.features(target_x)
+
+        test_accs, losses, accs = [], [], []
+        for features, y in support:
+            decoder = copy.deepcopy(self.model.decoder)
+            optimizer = torch.optim.AdamW(decoder.parameters(), lr=self.lr)
+            episode_losses, episode_accs = [], []
+            for _ in range(self.innerepochs):
+                optimizer.zero_grad()
+                outputs = decoder(features).reshape(len(y), -1).float()
+                loss = F.cross_entropy(outputs, y)
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(decoder.parameters(), self.max_grad_norm)
+                optimizer.step()
+                episode_losses.append(loss.detach())
+                episode_accs.append((outputs.argmax(1) == y).float().mean())
+            with torch.no_grad():
+                predictions = decoder(target_features).argmax(-1).reshape(-1)
+            test_accs.append((predictions == target_y).float().mean())
+            losses.append(torch.stack(episode_losses))
+            accs.append(torch.stack(episode_accs))
+        return torch.stack(test_accs), torch.stack(losses, 1), torch.stack(accs, 1)
@@ -0,0 +1,52 @@
+#when meta-training evaluates, and on what
+
+import time
+import numpy as np
+
+
+def stratified_subset(y, size, seed=0):
+    """
+    sorted indices of a fixed random subset of y with about size samples and the class proportions of y,
+    every class present in y keeps at least one sample
+    """
+    y = np.asarray(y)
+    rng = np.random.RandomState(seed)
+    classes, counts = np.unique(y, return_counts=True)
+    share = np.maximum(np.round(counts * min(size, len(y)) / len(y)).astype(int), 1)
+    idx = [rng.choice(np.flatnonzero(y == c), n, replace=False) for c, n in zip(classes, np.minimum(share, counts))]
+    return np.sort(np.concatenate(idx))
+
+
+class EvalScheduler(object):
+    """
+    due(end_of_epoch) is called after every meta-update and says whether to evaluate now: after every
+    every_tasks updates, at the end of every epoch with every_epoch, or once every_seconds have passed
+    since the last evaluation; any cadence that is set can trigger it
+    improved(proxy_acc) keeps the best accuracy on the proxy subset, the full evaluation only runs when it rises
+    """
+
+    def __init__(self, every_tasks=1, every_epoch=False, every_seconds=None):
+        self.every_tasks = every_tasks
+        self.every_epoch = every_epoch
+        self.every_seconds = every_seconds
+        self.tasks = 0
+        self.last = time.monotonic()
+        self.best_proxy = -np.inf
+
+    def due(self, end_of_epoch=False):
+        self.tasks += 1
+        now = time.monotonic()
+        if ((self.every_tasks and self.tasks % self.every_tasks == 0) or (self.every_epoch and end_of_epoch) or
+                (self.every_seconds is not None and now - self.last >= self.every_seconds)):
+            self.last = now
+            return True
+        return False
+
+    def improved(self, proxy_acc):
+        if proxy_acc > self.best_proxy:
+            self.best_proxy = proxy_acc
+            return True
+        return False
+
+    def reset_best(self):
+        self.best_proxy = -np.inf
@@ -212,9 +212,9 @@
 #         #     print(confusion_matrix[i])
 
 
-import scipy.io as sc
 import numpy as np
 from functions import *
+from window_cache import load_act_time_sequences
 #from act_models import *
 #from gram_model import *
 # from gcram_model import *
@@ -271,8 +271,6 @@ glimpse_time_down_scale = 4
 glimpse_location_down_scale = 4
 
 file_name = datasets_dict[dataset][0]
-file_data = sc.loadmat(path + file_name + '.mat')
-file_data = file_data[file_name]
 
 nb_subjects = datasets_dict[dataset][1]
 nb_classes = datasets_dict[dataset][2]
@@ -281,31 +279,21 @@ source_range = list(range(nb_subjects))
 source_range.remove(target_id)
 target_range = [target_id]
 
-source_data = get_act_data(file_data, source_range)
-target_data = get_act_data(file_data, target_range)
-
 if dataset == 'UCI':
     print('dataset is UCI')
-    source_data = sc.loadmat(path + 'UCI_train_raw' + '.mat')
-    source_data = source_data['UCI_train_raw']
-
-    target_data = sc.loadmat(path + 'UCI_test_raw' + '.mat')
-    target_data = target_data['UCI_test_raw']
-
-# print(source_data.shape)
-
-source_X, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-target_X, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
+    source_X, source_y, source_u = load_act_time_sequences(path + 'UCI_train_raw' + '.mat', 'UCI_train_raw', window_size, step, columnar=True)
+    target_X, target_y, target_u = load_act_time_sequences(path + 'UCI_test_raw' + '.mat', 'UCI_test_raw', window_size, step, columnar=True)
+else:
+    source_X, source_y, source_u = load_act_time_sequences(path + file_name + '.mat', file_name, window_size, step, source_range, columnar=True)
+    target_X, target_y, target_u = load_act_time_sequences(path + file_name + '.mat', file_name, window_size, step, target_range, columnar=True)
 
 nb_feature = source_X.shape[-1]
 # source_X = source_X.reshape([source_X.shape[0], -1])
 # target_X = target_X.reshape([target_X.shape[0], -1])
 
-source_X, source_y, source_u = seed_shuffle(source_X, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-target_X, target_y, target_u = seed_shuffle(target_X, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
+source_X, source_y, source_u = shuffled_prefix((source_X, source_y, source_u), source_size, seed=1)
+target_X, target_y, target_u = shuffled_prefix((target_X, target_y, target_u), target_size, seed=1)
 
-source_X, source_y, source_u = source_X[: source_size], source_y[: source_size], source_u[: source_size]
-target_X, target_y, target_u = target_X[: target_size], target_y[: target_size], target_u[: target_size]
 
 
 # model
@@ -112,11 +112,15 @@ def random_get_support(source_X, source_y, support_size):
 
     return np.array(support_x),np.array(support_y)
 
-import scipy.io as sc
 import numpy as np
-from functions import *
-from grcam_model import *
-from puretran import *
+from data_utils import *
+from window_cache import load_act_time_sequences, load_subject_windows
+from puretran_torch import *
+from reptile import BatchedReptile, FlatReptile, InnerOptimizer
+from reptile_parallel import ParallelReptile
+from metrics import RunningMean
+from eval_schedule import EvalScheduler, stratified_subset
+from episodic_eval import EpisodicEvaluator, HeadOnlyEvaluator, SerialEvaluator
 import random
 import os
 import torch.nn.functional as F
@@ -216,8 +220,6 @@ target_size = 2000
 window_size = 20
 step = 10
 file_name = datasets_dict[dataset][0]
-file_data = sc.loadmat(path + file_name + '.mat')
-file_data = file_data[file_name]
 nb_subjects = datasets_dict[dataset][1]
 nb_classes = datasets_dict[dataset][2]
 
@@ -234,26 +236,69 @@ has_pe = True
 # parameters in training phase
 innerstepsize = 2e-3  # stepsize in inner loop, 1e-2 really bad
 innerepochs = 50  # number of epochs of each inner loop
+#state of the inner AdamW when a task starts: 'reset' zeroes one persistent optimizer (same as a new one),
+#'per_task' resumes the moments the task ended its last visit with
+inner_state = 'reset'
+#tasks trained together by BatchedReptile (LOPO branch), opt-in for CUDA where the vmapped group keeps the
+#device busy (bench_batched_reptile.py reports tasks/s, on CPU it is slower); 1 keeps the serial loop
+#and its inner_state, each group starts from a zeroed AdamW
+tasks_per_batch = 1
+#worker processes training tasks asynchronously with ParallelReptile (LOPO branch, needs device = 'cpu'),
+#0 keeps the loops above; max_staleness bounds how many other updates may land while a task trains
+nb_workers = 0
+max_staleness = None
+#evaluation during LOPO meta-training: after every eval_every_tasks meta-updates, at the end of each epoch
+#(eval_every_epoch) or every eval_every_seconds; 1, False, None evaluates after every task
+#the best validation accuracy is still forgotten every 101 meta-updates, so the next evaluation after that
+#saves a new model whichever cadence is set
+eval_every_tasks = 1
+eval_every_epoch = False
+eval_every_seconds = None
+#query windows in a fixed stratified proxy that is checked first, the full query and target sets are only
+#evaluated when its accuracy improves; None evaluates the full sets every time
+proxy_size = None
 o_outerstepsize = 0.02
 decay_rate = 0.999
 min_learning_rate = 1e-3
 epoch = 200
 max_gradient_norm = 2.0
 # in test phase
+#the reported test accuracies are those of each checkpoint after adapting it on the episode; the loop used to
+#adapt the meta-trained model and score the unadapted checkpoint, so older results are not comparable
 innerstepsize_test = 1e-4
 innerepochs_test = 30
 epoch_test = 20
+#batched_episodes adapts all epoch_test episodes of a checkpoint together (EpisodicEvaluator), opt-in for
+#CUDA (bench_episodes.py reports the speedup, on CPU it is slower than one episode at a time);
+#episode_chunk adapted copies score the target set per pass
+batched_episodes = False
+episode_chunk = 2
+#test-time adaptation: 'full' fine-tunes the whole model per episode, 'head' only its decoder on
+#backbone features computed once per checkpoint
+adapt_mode = 'full'
+
+if tasks_per_batch > 1 and inner_state == 'per_task':
+    raise ValueError(f"tasks_per_batch = {tasks_per_batch} starts every task group from a zeroed AdamW, "
+                     f"inner_state = 'per_task' needs tasks_per_batch = 1")
+if nb_workers and inner_state == 'per_task':
+    raise ValueError(f"nb_workers = {nb_workers} gives every worker its own AdamW, reset at each task, "
+                     f"inner_state = 'per_task' needs nb_workers = 0")
+if nb_workers and device != 'cpu':
+    raise ValueError(f"nb_workers = {nb_workers} runs the Reptile tasks in CPU processes, set device = 'cpu' "
+                     f"(device is '{device}')")
 
 source_range = list(range(nb_subjects))
 print("source range: ",source_range)
 
 test_acc_total = []
+train_metrics = RunningMean('loss', 'acc')
 # for MH, PMP, MARS dataset
 target_range2 = [5]
 # ts stores the time in seconds
 ts1 = time.time()
 if dataset != 'UCI':
     #leave one person out
+    subject_windows = load_subject_windows(path + file_name + '.mat', file_name, window_size, step, source_range, columnar=True)
    
     for target_id in target_range2:
         outerstepsize = o_outerstepsize
@@ -264,8 +309,8 @@ if dataset != 'UCI':
         print("source_copy range:",source_range_copy)
         target_range = [target_id]
 
-        source_data = get_act_data(file_data, source_range_copy)
-        target_data = get_act_data(file_data, target_range)
+        source_x, source_y, source_u = subject_windows.fold(source_range_copy)
+        target_x, target_y, target_u = subject_windows.fold(target_range)
 
         # print("source range copy: ",source_range_copy)
         # print("target id: ",target_id)
@@ -273,17 +318,12 @@ if dataset != 'UCI':
 
         user_id = [i for i in range(nb_subjects)]
 
-
-        source_x, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-        target_x, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
-
         nb_feature = source_x.shape[-1]
 
 
-        source_x, source_y, source_u = seed_shuffle(source_x, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-        target_x, target_y, target_u = seed_shuffle(target_x, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
+        source_x, source_y, source_u = shuffled_prefix((source_x, source_y, source_u), source_size, seed=1)
+        target_x, target_y, target_u = shuffled_prefix((target_x, target_y, target_u), target_size, seed=1)
 
-        source_x, source_y, source_u = source_x[ :source_size], source_y[:source_size], source_u[:source_size]
         total_num_source = source_x.shape[0]
         
         num_train = int(total_num_source * 1)
@@ -293,7 +333,6 @@ if dataset != 'UCI':
        # print("total for eval:",eval_x.shape)
         source_x, source_y, source_u = source_x[: num_train], source_y[: num_train], source_u[: num_train]
        # print("total for training:",source_x.shape)
-        target_x, target_y, target_u = target_x[: target_size], target_y[: target_size], target_u[: target_size]
         #print("total for test:",target_x.shape)
 
         #the path to store and restore the model
@@ -304,6 +343,9 @@ if dataset != 'UCI':
         #without positional encoding
         model = PureTran_torch(height = window_size, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
                  pe =has_pe ,dropout=dropout).to(device)
+        reptile = FlatReptile(model)
+        inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize, per_task = inner_state == 'per_task')
+        batched_reptile = BatchedReptile(model, innerstepsize)
         
         source_x , source_y, quary_x, quary_y  =get_data_each_user(source_x, source_y, source_u, nb_subjects,user_id, user_except = target_id, training_percent = 0.7)
         
@@ -321,79 +363,127 @@ if dataset != 'UCI':
         best_val_acc_50count = 0
         count = 0
 
+        eval_scheduler = EvalScheduler(eval_every_tasks, eval_every_epoch, eval_every_seconds)
+        if proxy_size:
+            proxy_idx = torch.tensor(stratified_subset(quary_y.cpu().numpy(), proxy_size)).to(device)
+            proxy_x, proxy_y = quary_x[proxy_idx], quary_y[proxy_idx]
+
         # # task number equals to number of people - 1
         task_nb = nb_subjects-1
         task_ids = np.arange(task_nb)
+        #task order from its own seeded RNG, the global one is not seeded anywhere
+        task_rng = np.random.RandomState(1)
+        steps_per_epoch = task_nb if nb_workers else int(np.ceil(task_nb / tasks_per_batch))
+
+        if nb_workers:
+            #the tasks of a target are fixed, its workers live across epochs
+            parallel_reptile = ParallelReptile(model, reptile, [(torch.tensor(source_x[task_num]).float(),
+                                                                 torch.tensor(source_y[task_num]).long())
+                                                                for task_num in range(task_nb)],
+                                               nb_workers, innerepochs, innerstepsize, max_staleness)
+
+        #yields after every meta-update, train_metrics adds up the inner steps until the next log line
+        def reptile_steps(task_ids):
+            if nb_workers:
+                #reads outerstepsize when each delta lands, so the decay below applies
+                for _, _, losses, accs in parallel_reptile.run(task_ids, lambda: outerstepsize):
+                    train_metrics.update(loss = losses, acc = accs)
+                    yield
+                return
+
+            #tasks_per_batch > 1 trains that many tasks at once and moves the model by their mean delta
+            task_groups = np.array_split(task_ids, int(np.ceil(task_nb / tasks_per_batch)))
+            for task_group in task_groups:
+                if len(task_group) > 1:
+                    model.train()
+                    tasks = [(torch.tensor(source_x[task_num]).float().to(device),
+                              torch.tensor(source_y[task_num]).long().to(device)) for task_num in task_group]
+                    losses, accs = batched_reptile.run(tasks, innerepochs, outerstepsize)
+                    train_metrics.update(loss = losses, acc = accs)
+                else:
+                    task_num = task_group[0]
+                    x, y = source_x[task_num], source_y[task_num]
 
-        #training epoches
-        for epoch in range(1, epoch+1):
+                    model.train()
 
-            np.random.shuffle(task_ids)
-            # print("support x shape:",source_x.shape)
-            # print("support y shape:",source_y.shape)
+                    x = torch.tensor(x).float().to(device) #shape: [batch_size, 225]
+                    y = torch.tensor(y).long().to(device) #shape: [batch_size * 225]
 
-            for step, task_num in enumerate(task_ids):
-                x, y = source_x[task_num], source_y[task_num]
-
-                model.train()
-                train_acc = []
-                train_losses = []
-
-                x = torch.tensor(x).float().to(device) #shape: [batch_size, 225]
-                y = torch.tensor(y).long().to(device) #shape: [batch_size * 225]
-
-                weights_before = deepcopy(model.state_dict())
-                optimizer = torch.optim.AdamW(model.parameters(), lr=innerstepsize)
-
-                for _ in range(innerepochs):
-                    optimizer.zero_grad()
-                    outputs = model(x)
-                    outputs = outputs.reshape(-1, nb_classes).float()
-                    # print(outputs.shape)
-                    # print(y.shape)
-                    loss = F.cross_entropy(outputs, y)
-                    loss.backward()
-                    torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
-                    optimizer.step()
-                    train_losses.append(loss.item())
-                    # print("outputs:",outputs.argmax(1))
-                    acc = (outputs.argmax(1) == y).float().mean().item()
-                    train_acc.append(acc)
+                    reptile.begin_task()
+                    optimizer = inner_optimizer.begin_task(task_num)
 
-                #valid_before_acc = validation(model,quary_x,quary_y)
+                    for _ in range(innerepochs):
+                        optimizer.zero_grad()
+                        outputs = model(x)
+                        outputs = outputs.reshape(-1, nb_classes).float()
+                        # print(outputs.shape)
+                        # print(y.shape)
+                        loss = F.cross_entropy(outputs, y)
+                        loss.backward()
+                        torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
+                        optimizer.step()
+                        # print("outputs:",outputs.argmax(1))
+                        train_metrics.update(loss = loss, acc = (outputs.argmax(1) == y).float().mean())
 
-                weights_after = model.state_dict()
+                    #valid_before_acc = validation(model,quary_x,quary_y)
 
-                model.load_state_dict({name:
-                                weights_before[name] + (weights_after[name] -
-                                                        weights_before[name]) * outerstepsize
-                                for name in weights_before})
+                    reptile.end_task(outerstepsize)
+                yield
 
+        train_metrics.reset()
+        #training epoches
+        for epoch in range(1, epoch+1):
+
+            task_rng.shuffle(task_ids)
+            # print("support x shape:",source_x.shape)
+            # print("support y shape:",source_y.shape)
+
+            for step, _ in enumerate(reptile_steps(task_ids)):
                 #update the outerstepsize
                 outerstepsize *= decay_rate
                 if outerstepsize < min_learning_rate:
                     outerstepsize = min_learning_rate
 
+                #counts meta-updates, not evaluations, so the reset keeps its cadence whatever eval_every_tasks is
+                if count != 100:
+                    count += 1
+                else:
+                    count = 0
+                    best_val_acc_50count = 0
+                    eval_scheduler.reset_best()
+
+                if not eval_scheduler.due(end_of_epoch = step == steps_per_epoch - 1):
+                    continue
+
+                #means over every task since the last log line
+                train = train_metrics.result()
+                train_metrics.reset()
+                if proxy_size:
+                    proxy_acc = validation(model,proxy_x,proxy_y)
+                    if not eval_scheduler.improved(proxy_acc):
+                        print('target:',target_id,
+                            'epoch:', epoch, 'step:', step, '\ttraining loss:',
+                          f'{train["loss"]:.3}', '\ttraining acc:',
+                          f'{train["acc"]:.3}', '\tproxy acc:',
+                          f'{proxy_acc:.3}')
+                        continue
+
                 valid_after_acc = validation(model,quary_x,quary_y)
                 test_acc = validation(model,target_x,target_y)
 
                 print('target:',target_id,
                     'epoch:', epoch, 'step:', step, '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\tvalidation after acc:',
+                  f'{train["loss"]:.3}', '\ttraining acc:',
+                  f'{train["acc"]:.3}', '\tvalidation after acc:',
                   f'{np.mean(valid_after_acc):.3}','\ttest acc:',
                   f'{np.mean(test_acc):.3}')
 
-                if count != 100:
-                    count += 1
-                else:
-                    count = 0
-                    best_val_acc_50count = 0
                 if valid_after_acc > best_val_acc_50count:  # evaluation
                     best_val_acc_50count = np.copy(valid_after_acc)
                     fn = f'./{weights_dir}/epoch_{epoch}_step_{step}_acc_{valid_after_acc:.3}.pth'
                     torch.save(model.state_dict(), fn)
-        
+        if nb_workers:
+            parallel_reptile.close()
 
         #test
         def cond(x): return float(x.split('/')[-1].split('_')[-1][:-4])
@@ -407,56 +497,43 @@ if dataset != 'UCI':
         #do the n-way 1-shot
         N_way = nb_classes
         K_shot = 1
+        model_test = PureTran_torch(height = window_size, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
+             pe = has_pe,dropout=dropout).to(device)
+        #adapts the checkpoint (or its decoder) afresh for every episode and scores it on the target set
+        if adapt_mode == 'head':
+            evaluator = HeadOnlyEvaluator(model_test, innerstepsize_test, innerepochs)
+        elif batched_episodes:
+            evaluator = EpisodicEvaluator(model_test, innerstepsize_test, innerepochs, chunk_size = episode_chunk)
+        else:
+            evaluator = SerialEvaluator(model_test, innerstepsize_test, innerepochs)
+
         for fn in all_model_fn:
             print('Processing fn', fn)
             state = torch.load(fn)
-
-            model_test = PureTran_torch(height = window_size, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
-                 pe = has_pe,dropout=dropout).to(device)
-
-            #per model
-            all_train_acc = []
-            all_test_acc = []
+            model_test.load_state_dict(state)
 
             # do a number of random selected Nway Kshot and get the average performance of the model
+            episodes = []
             for e in range(1, epoch_test+1):
                 support_x , support_y= random_get_Nway_Kshot(target_x, target_y,N_way,K_shot)
-                model_test.load_state_dict(state)
 
-                x, y = support_x, support_y
-         
-                train_acc = []
-                train_losses = []
-                x = torch.tensor(x).float() 
+                x = torch.tensor(np.array(support_x)).float()
                 x = torch.reshape(x,(-1,window_size, nb_feature)).to(device)
-                y = torch.tensor(y).long().to(device)
-
-                optimizer = torch.optim.AdamW(model.parameters(), lr = innerstepsize_test)
-
-                model.train()
-                for _ in range(innerepochs):
-                    optimizer.zero_grad()
-                    #print("x shape: ",x.shape)
-                    outputs = model(x)
-                    outputs = outputs.reshape(-1, nb_classes).float()
-                    loss = F.cross_entropy(outputs, y)
-                    loss.backward()
-                    torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
-                    optimizer.step()
-                    train_losses.append(loss.item())
-                    acc = (outputs.argmax(1) == y).float().mean().item()
-                    train_acc.append(acc)
-       
-                all_train_acc.append(np.mean(train_acc))
-    
-                test_acc = validation(model_test, target_x, target_y)
-                all_test_acc.append(test_acc)
+                y = torch.tensor(support_y).long().to(device)
+                episodes.append((x, y))
+
+            all_test_acc, train_losses, train_accs = evaluator.run(episodes, target_x, target_y)
+            #per model
+            all_test_acc = all_test_acc.tolist()
+            all_train_acc = train_accs.mean(0).tolist()
+            train_losses = train_losses.mean(0).tolist()
 
+            for e in range(1, epoch_test+1):
                 print('epoch:', e,  '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\ttest acc:',
-                  f'{np.mean(test_acc):.3}')
-           
+                  f'{train_losses[e-1]:.3}', '\ttraining acc:',
+                  f'{all_train_acc[e-1]:.3}', '\ttest acc:',
+                  f'{all_test_acc[e-1]:.3}')
+
             if np.mean(all_test_acc) > best_model_acc:
                 best_model_acc = np.mean(all_test_acc)
 
@@ -475,25 +552,17 @@ if dataset != 'UCI':
 
 if dataset == 'UCI':
     print('dataset is UCI')
-    source_data = sc.loadmat(path + 'UCI_train_raw' + '.mat')
-    source_data = source_data['UCI_train_raw']
-
-    target_data = sc.loadmat(path + 'UCI_test_raw' + '.mat')
-    target_data = target_data['UCI_test_raw']
+    source_x, source_y, source_u = load_act_time_sequences(path + 'UCI_train_raw' + '.mat', 'UCI_train_raw', window_size, step, columnar=True)
+    target_x, target_y, target_u = load_act_time_sequences(path + 'UCI_test_raw' + '.mat', 'UCI_test_raw', window_size, step, columnar=True)
     user_id = [1,3,5,7,8,11,14,15,16,17,19,21,22,23,25,26,27,28,29,30]
     target_id = 0 #no 0 id in target_data
 
     target_all = [2, 4, 9, 10, 12, 13, 18, 20, 24]
 
-    source_x, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-    target_x, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
-
     nb_feature = source_x.shape[-1]
 
-    source_x, source_y, source_u = seed_shuffle(source_x, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-    target_x, target_y, target_u = seed_shuffle(target_x, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
-
-    source_x, source_y, source_u = source_x[ :source_size], source_y[:source_size], source_u[:source_size]
+    source_x, source_y, source_u = shuffled_prefix((source_x, source_y, source_u), source_size, seed=1)
+    target_x, target_y, target_u = shuffled_prefix((target_x, target_y, target_u), target_size, seed=1)
 
     total_num_source = source_x.shape[0]
     print("total for training:",total_num_source)
@@ -502,8 +571,6 @@ if dataset == 'UCI':
         #use 70% to train, 30% to do model selection
     eval_x,eval_y,eval_u = source_x[num_train:], source_y[num_train:], source_u[num_train:]
     source_x, source_y, source_u = source_x[: num_train], source_y[: num_train], source_u[: num_train]
-    
-    target_x, target_y, target_u = target_x[: target_size], target_y[: target_size], target_u[: target_size]
 
 
     #the path to store and restore the model
@@ -514,6 +581,8 @@ if dataset == 'UCI':
 
     model = PureTran_torch(height = window_size, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
                  pe = has_pe,dropout=dropout).to(device)
+    reptile = FlatReptile(model)
+    inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize, per_task = inner_state == 'per_task')
 
     source_x , source_y, quary_x, quary_y  = get_data_each_user(source_x, source_y, source_u, nb_subjects,user_id, user_except = target_id, training_percent = 0.7)
     source_x = torch.tensor(source_x).float().to(device)
@@ -534,11 +603,13 @@ if dataset == 'UCI':
     # task number equals to number of people for UCI
     task_nb = len(user_id)
     task_ids = np.arange(task_nb)
+    task_rng = np.random.RandomState(1)
 
+    train_metrics.reset()
     #training epoches
     for epoch in range(1, epoch+1):
 
-        np.random.shuffle(task_ids)
+        task_rng.shuffle(task_ids)
             # print("support x shape:",source_x.shape)
             # print("support y shape:",source_y.shape)
 
@@ -546,14 +617,12 @@ if dataset == 'UCI':
             x, y = source_x[task_num], source_y[task_num]
 
             model.train()
-            train_acc = []
-            train_losses = []
 
             x = torch.tensor(x).float().to(device) #shape: [batch_size, 225]
             y = torch.tensor(y).long().to(device) #shape: [batch_size * 225]
 
-            weights_before = deepcopy(model.state_dict())
-            optimizer = torch.optim.AdamW(model.parameters(), lr=innerstepsize)
+            reptile.begin_task()
+            optimizer = inner_optimizer.begin_task(task_num)
 
             for _ in range(innerepochs):
                 optimizer.zero_grad()
@@ -565,19 +634,12 @@ if dataset == 'UCI':
                 loss.backward()
                 torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
                 optimizer.step()
-                train_losses.append(loss.item())
                 # print("outputs:",outputs.argmax(1))
-                acc = (outputs.argmax(1) == y).float().mean().item()
-                train_acc.append(acc)
+                train_metrics.update(loss = loss, acc = (outputs.argmax(1) == y).float().mean())
 
                 #valid_before_acc = validation(model,quary_x,quary_y)
 
-                weights_after = model.state_dict()
-
-                model.load_state_dict({name:
-                                weights_before[name] + (weights_after[name] -
-                                                        weights_before[name]) * outerstepsize
-                                for name in weights_before})
+                reptile.end_task(outerstepsize)
 
                 #update the outerstepsize
                 outerstepsize *= decay_rate
@@ -587,10 +649,12 @@ if dataset == 'UCI':
                 valid_after_acc = validation(model,quary_x,quary_y)
                 test_acc = validation(model,target_x,target_y)
 
+                train = train_metrics.result()
+                train_metrics.reset()
                 print('target:',target_id,
                     'epoch:', epoch, 'step:', step, '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\tvalidation after acc:',
+                  f'{train["loss"]:.3}', '\ttraining acc:',
+                  f'{train["acc"]:.3}', '\tvalidation after acc:',
                   f'{np.mean(valid_after_acc):.3}','\ttest acc:',
                   f'{np.mean(test_acc):.3}')
 
@@ -625,56 +689,42 @@ if dataset == 'UCI':
 
         target_each_y = target_y[np.where(target_u == test_u)[0]]
 
+        model_test = PureTran_torch(height = window_size, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
+             pe = has_pe,dropout=dropout).to(device)
+        if adapt_mode == 'head':
+            evaluator = HeadOnlyEvaluator(model_test, innerstepsize_test, innerepochs)
+        elif batched_episodes:
+            evaluator = EpisodicEvaluator(model_test, innerstepsize_test, innerepochs, chunk_size = episode_chunk)
+        else:
+            evaluator = SerialEvaluator(model_test, innerstepsize_test, innerepochs)
+
         for fn in all_model_fn:
             print('Processing fn', fn)
             state = torch.load(fn)
-
-            model_test = PureTran_torch(height = window_size, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
-                 pe = has_pe,dropout=dropout).to(device)
-
-            #per model
-            all_train_acc = []
-            all_test_acc = []
+            model_test.load_state_dict(state)
 
             # do a number of random selected Nway Kshot and get the average performance of the model
+            episodes = []
             for e in range(1, epoch_test+1):
                 support_x , support_y= random_get_Nway_Kshot(target_each_x, target_each_y,N_way,K_shot)
-                model_test.load_state_dict(state)
 
-                x, y = support_x, support_y
-         
-                train_acc = []
-                train_losses = []
-                x = torch.tensor(x).float() 
+                x = torch.tensor(np.array(support_x)).float()
                 x = torch.reshape(x,(-1,window_size, nb_feature)).to(device)
-                y = torch.tensor(y).long().to(device)
-
-                optimizer = torch.optim.AdamW(model.parameters(), lr = innerstepsize_test)
-
-                model.train()
-                for _ in range(innerepochs):
-                    optimizer.zero_grad()
-                    #print("x shape: ",x.shape)
-                    outputs = model(x)
-                    outputs = outputs.reshape(-1, nb_classes).float()
-                    loss = F.cross_entropy(outputs, y)
-                    loss.backward()
-                    torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
-                    optimizer.step()
-                    train_losses.append(loss.item())
-                    acc = (outputs.argmax(1) == y).float().mean().item()
-                    train_acc.append(acc)
-       
-                all_train_acc.append(np.mean(train_acc))
-    
-                test_acc = validation(model_test, target_x, target_y)
-                all_test_acc.append(test_acc)
+                y = torch.tensor(support_y).long().to(device)
+                episodes.append((x, y))
+
+            all_test_acc, train_losses, train_accs = evaluator.run(episodes, target_x, target_y)
+            #per model
+            all_test_acc = all_test_acc.tolist()
+            all_train_acc = train_accs.mean(0).tolist()
+            train_losses = train_losses.mean(0).tolist()
 
+            for e in range(1, epoch_test+1):
                 print('epoch:', e,  '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\ttest acc:',
-                  f'{np.mean(test_acc):.3}')
-            
+                  f'{train_losses[e-1]:.3}', '\ttraining acc:',
+                  f'{all_train_acc[e-1]:.3}', '\ttest acc:',
+                  f'{all_test_acc[e-1]:.3}')
+
             if np.mean(all_test_acc) > best_model_acc:
                 best_model_acc = np.mean(all_test_acc)
 
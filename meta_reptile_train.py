@@ -1,13 +1,14 @@
 
-import scipy.io as sc
 import numpy as np
-from functions import *
+from data_utils import *
+from window_cache import load_act_time_sequences
 #from act_models import *
 #from gram_model import *
 # from gcram_model import *
 #from grcam_model import *
-from puretran import *
-from copy import deepcopy
+from puretran_torch import *
+from reptile import FlatReptile, InnerOptimizer
+from metrics import RunningMean
 import torch.nn.functional as F
 import torch
 import random
@@ -152,8 +153,6 @@ max_gradient_norm = 5.0
 
 
 file_name = datasets_dict[dataset][0]
-file_data = sc.loadmat(path + file_name + '.mat')
-file_data = file_data[file_name]
 
 nb_subjects = datasets_dict[dataset][1]
 nb_classes = datasets_dict[dataset][2]
@@ -162,31 +161,21 @@ source_range = list(range(nb_subjects))
 source_range.remove(target_id)
 target_range = [target_id]
 
-source_data = get_act_data(file_data, source_range)
-target_data = get_act_data(file_data, target_range)
-
 if dataset == 'UCI':
     print('dataset is UCI')
-    source_data = sc.loadmat(path + 'UCI_train_raw' + '.mat')
-    source_data = source_data['UCI_train_raw']
-
-    target_data = sc.loadmat(path + 'UCI_test_raw' + '.mat')
-    target_data = target_data['UCI_test_raw']
-
-# print(source_data.shape)
-
-source_X, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-target_X, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
+    source_X, source_y, source_u = load_act_time_sequences(path + 'UCI_train_raw' + '.mat', 'UCI_train_raw', window_size, step, columnar=True)
+    target_X, target_y, target_u = load_act_time_sequences(path + 'UCI_test_raw' + '.mat', 'UCI_test_raw', window_size, step, columnar=True)
+else:
+    source_X, source_y, source_u = load_act_time_sequences(path + file_name + '.mat', file_name, window_size, step, source_range, columnar=True)
+    target_X, target_y, target_u = load_act_time_sequences(path + file_name + '.mat', file_name, window_size, step, target_range, columnar=True)
 
 nb_feature = source_X.shape[-1]
 # source_X = source_X.reshape([source_X.shape[0], -1])
 # target_X = target_X.reshape([target_X.shape[0], -1])
 
-source_X, source_y, source_u = seed_shuffle(source_X, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-target_X, target_y, target_u = seed_shuffle(target_X, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
+source_X, source_y, source_u = shuffled_prefix((source_X, source_y, source_u), source_size, seed=1)
+target_X, target_y, target_u = shuffled_prefix((target_X, target_y, target_u), target_size, seed=1)
 
-source_X, source_y, source_u = source_X[: source_size], source_y[: source_size], source_u[: source_size]
-target_X, target_y, target_u = target_X[: target_size], target_y[: target_size], target_u[: target_size]
 
 
 
@@ -208,9 +197,13 @@ device = 'cuda'
 
 model = PureTran_torch(height = img_height, nb_features = nb_feature,ntoken = ntokens, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
                  dropout=dropout).to(device)
+reptile = FlatReptile(model)
 
 innerstepsize = 1e-4  # stepsize in inner loop, 1e-2 really bad
 innerepochs = 30  # number of epochs of each inner loop
+#'reset' or 'per_task', as in meta_reptile_lopo.py
+inner_state = 'reset'
+inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize, per_task = inner_state == 'per_task')
 
 outerstepsize = 0.01
 decay_rate = 0.999
@@ -220,6 +213,7 @@ epoch = 100
 weights_dir = './model_weights_HAR_MH'
 os.makedirs(weights_dir, exist_ok=True)
 best_val_acc = 0
+train_metrics = RunningMean('loss', 'acc')
 #split to task
 task_nb = 100    #100 tasks in training set
 each_task = int(source_size/task_nb)  #each task has this num of 
@@ -229,6 +223,7 @@ quary_size = 24
 nb_train = 0.7
 #task_ids = np.arange(int(nb_train *task_nb))
 task_ids = np.arrange(task_nb)
+task_rng = np.random.RandomState(1)
 
 task_nb = nb_subjects-1
 
@@ -242,20 +237,19 @@ for epoch in range(1, epoch+1):
     quary_x = torch.tensor(quary_x).float().to(device)
     quary_y = torch.tensor(quary_y).long().to(device)
     # randomly shuffle the task orders.
-    np.random.shuffle(task_ids)
+    task_rng.shuffle(task_ids)
     for step, task_num in enumerate(task_ids):
         x, y = support_x[task_num], support_y[task_num]
         model.train()
-        train_acc = []
-        train_losses = []
+        train_metrics.reset()
         x = torch.tensor(x).float().to(device) #shape: [batch_size, 225]
         y = torch.tensor(y).long().to(device) #shape: [batch_size * 225]
         #x = x.long() 
         #y = y.long() 
         #print("y:shape",y.shape)
             #record the weight before the task training
-        weights_before = deepcopy(model.state_dict())
-        optimizer = torch.optim.AdamW(model.parameters(), lr=innerstepsize)
+        reptile.begin_task()
+        optimizer = inner_optimizer.begin_task(task_num)
         # starts training over the task
         for _ in range(innerepochs):
             optimizer.zero_grad()
@@ -266,10 +260,8 @@ for epoch in range(1, epoch+1):
             loss.backward()
             torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
             optimizer.step()
-            train_losses.append(loss.item())
           # print("outputs:",outputs.argmax(1))
-            acc = (outputs.argmax(1) == y).float().mean().item()
-            train_acc.append(acc)
+            train_metrics.update(loss = loss, acc = (outputs.argmax(1) == y).float().mean())
 
         #valid_before_acc = validation(model, arc_dataset)
         valid_before_acc = validation(model,quary_x,quary_y)
@@ -282,14 +274,8 @@ for epoch in range(1, epoch+1):
             # Interpolate between current weights and trained weights from this task
             # I.e. (weights_before - weights_after) is the meta-gradient
 
-            #record the weight after task training
-        weights_after = model.state_dict()
-
             #get the reptile
-        model.load_state_dict({name:
-                                weights_before[name] + (weights_after[name] -
-                                                        weights_before[name]) * outerstepsize
-                                for name in weights_before})
+        reptile.end_task(outerstepsize)
 
         #update the outerstepsize
         outerstepsize *= decay_rate
@@ -298,9 +284,10 @@ for epoch in range(1, epoch+1):
         #outerstepsize  =  (outerstepsize >= min_learning_rate)? outerstepsize*learning_rate_decay_factor :min_learning_rate
        # valid_after_acc = validation(model, arc_dataset)
         valid_after_acc = validation(model,quary_x,quary_y)
+        train = train_metrics.result()
         print('epoch:', epoch, 'step:', step, '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\tvalidation before acc:',
+                  f'{train["loss"]:.3}', '\ttraining acc:',
+                  f'{train["acc"]:.3}', '\tvalidation before acc:',
                   f'{np.mean(valid_before_acc):.3}', '\tvalidation after acc:',
                   f'{np.mean(valid_after_acc):.3}')
         if valid_after_acc > best_val_acc:  # evaluation
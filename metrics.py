@@ -0,0 +1,39 @@
+#running means of training metrics, kept on the device they are computed on
+
+import torch
+
+
+class RunningMean(object):
+    """
+    means of named metrics over the steps since the last reset()
+    update(loss=loss, acc=acc) adds detached tensors (scalars, or one value per step/task) to sums on their
+    own device without a host sync; result() reads every mean at once with a single transfer, call it at
+    log boundaries; names given to the constructor read nan until they are updated, like the mean of no steps
+    """
+
+    def __init__(self, *names):
+        self.sums = {}
+        self.counts = {name: 0 for name in names}
+
+    @torch.no_grad()
+    def update(self, **values):
+        for name, value in values.items():
+            value = value.detach().float()
+            if name not in self.sums:
+                self.sums[name] = torch.zeros((), device=value.device)
+                self.counts.setdefault(name, 0)
+            self.sums[name].add_(value.sum())
+            self.counts[name] += value.numel()
+
+    def result(self):
+        """
+        {name: mean} as python floats
+        """
+        sums = dict(zip(self.sums, torch.stack(list(self.sums.values())).tolist())) if self.sums else {}
+        return {name: sums[name] / count if count else float('nan') for name, count in self.counts.items()}
+
+    def reset(self):
+        for total in self.sums.values():
+            total.zero_()
+        for name in self.counts:
+            self.counts[name] = 0
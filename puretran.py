@@ -6,9 +6,7 @@ from tensorflow.contrib.legacy_seq2seq.python.ops.seq2seq import rnn_decoder
 from tensorflow.python.ops.distributions.normal import Normal
 from functions import *
 import numpy as np
-import torch.nn as nn
-import math
-import torch
+from puretran_torch import *
 
 def _weight_variable(shape):
     initial = tf.truncated_normal(shape=shape, stddev=0.01)
@@ -116,78 +114,3 @@ class PureTrans(object):
                 zip(clipped_gradients, params), global_step=self.global_step)
 
         self.saver = tf.train.Saver(tf.global_variables(), max_to_keep=99999999)
-
-class PositionalEncoding(nn.Module):
-
-    def __init__(self, d_model, dropout=0.1, max_len=5000):
-        super(PositionalEncoding, self).__init__()
-        self.dropout = nn.Dropout(p=dropout)
-
-        pe = torch.zeros(max_len, d_model)
-        position = torch.arange(0, max_len, dtype=torch.float).unsqueeze(1)
-        div_term = torch.exp(torch.arange(
-            0, d_model, 2).float() * (-math.log(10000.0) / d_model))
-        pe[:, 0::2] = torch.sin(position * div_term)
-        pe[:, 1::2] = torch.cos(position * div_term)
-        pe = pe.unsqueeze(0).transpose(0, 1)
-        self.register_buffer('pe', pe)
-
-    def forward(self, x):
-        x = x + self.pe[:x.size(0), :]
-        return self.dropout(x)
-
-class PureTran_torch(nn.Module):
-    def __init__(self, height,nb_features,ntoken, ninp, nhead, nhid, nlayers,pe = False,
-                 dropout=0.5):
-        super(PureTran_torch, self).__init__()
-        from torch.nn import TransformerEncoder, TransformerEncoderLayer
-        self.model_type = 'Transformer'
-        self.src_mask = None
-        self.height = height
-        self.nb_features= nb_features  #for linear transformation
-        self.encoder = nn.Sequential(nn.Linear(nb_features, ninp//4),
-                                     nn.Linear(ninp//4, ninp))
-        #self.pos_encoder = PositionalEncoding(ninp, dropout)
-        self.has_pe = pe
-        self.pos_encoder = PositionalEncoding(ninp, dropout)
-        encoder_layers = TransformerEncoderLayer(ninp, nhead, nhid, dropout)
-        self.transformer_encoder = TransformerEncoder(encoder_layers, nlayers)
-        
-        self.ninp = ninp
-        self.decoder = nn.Sequential(nn.Linear(ninp, ninp//4),
-                                     nn.Linear(ninp//4, ntoken))
-        # self.mesh_grid = MeshGrid()
-
-    def _generate_square_subsequent_mask(self, sz):
-        mask = (torch.triu(torch.ones(sz, sz)) == 1).transpose(0, 1)
-        mask = mask.float().masked_fill(mask == 0, float(
-            '-inf')).masked_fill(mask == 1, float(0.0))
-        return mask
-
-    def init_weights(self):
-        initrange = 0.1
-        self.encoder.weight.data.uniform_(-initrange, initrange)
-        self.decoder.bias.data.zero_()
-        self.decoder.weight.data.uniform_(-initrange, initrange)
-
-    def forward(self, src):
-        # if self.src_mask is None or self.src_mask.size(0) != len(src):
-        #     device = src.device
-        #     mask = self._generate_square_subsequent_mask(len(src)).to(device)
-        #     self.src_mask = mask
-
-      #  src = self.encoder(src) * math.sqrt(self.ninp)
-       # torch.reshape(src,(-1,))
-       # print("src shape:",src.shape)
-       # print("num of features:",self.nb_features)
-        src = self.encoder(src)
-        if self.has_pe:
-          src = self.pos_encoder(src)
-        #src.reshape()
-        output = self.transformer_encoder(src, mask=self.src_mask)
-        # output = self.mesh_grid(
-        #     self.transformer_encoder(src, mask=self.src_mask))
-        output = output[:,::self.height]
-        output = self.decoder(output)
-        return output
-
@@ -0,0 +1,249 @@
+#PyTorch transformer for the torch scripts, importable without TensorFlow
+
+import copy
+import json
+import math
+import warnings
+import numpy as np
+import torch
+import torch.nn as nn
+from act_stream import ActStreamWindower
+
+class PositionalEncoding(nn.Module):
+
+    def __init__(self, d_model, dropout=0.1, max_len=5000, batch_first=False):
+        super(PositionalEncoding, self).__init__()
+        self.batch_first = batch_first
+        self.dropout = nn.Dropout(p=dropout)
+
+        pe = torch.zeros(max_len, d_model)
+        position = torch.arange(0, max_len, dtype=torch.float).unsqueeze(1)
+        div_term = torch.exp(torch.arange(
+            0, d_model, 2).float() * (-math.log(10000.0) / d_model))
+        pe[:, 0::2] = torch.sin(position * div_term)
+        pe[:, 1::2] = torch.cos(position * div_term)
+        pe = pe.unsqueeze(0).transpose(0, 1)
+        self.register_buffer('pe', pe)
+
+    def window(self, length):
+        """
+        keep only the first length positions, for inference on fixed-length windows
+        """
+        self.pe = self.pe[:length].clone()
+
+    def forward(self, x):
+        #pe keeps its [max_len:1:d_model] shape in both modes so checkpoints load either way
+        if self.batch_first:
+            x = x + self.pe[:x.size(1), :].transpose(0, 1)
+        else:
+            x = x + self.pe[:x.size(0), :]
+        return self.dropout(x)
+
+class PureTran_torch(nn.Module):
+    """
+    input [batch:window:feature], output [batch:1:ntoken]
+    the default seq-first encoder reads dim 0 as the sequence, so attention (and pe) run across
+    the batch; batch_first=True attends over the window of each sample instead
+    cls_only=True makes eval-mode forward compute only the encoder outputs the decoder reads
+    """
+    def __init__(self, height,nb_features,ntoken, ninp, nhead, nhid, nlayers,pe = False,
+                 dropout=0.5, batch_first=False, cls_only=False):
+        super(PureTran_torch, self).__init__()
+        #constructor arguments, written into exported files
+        self.hparams = dict(height=height, nb_features=nb_features, ntoken=ntoken, ninp=ninp, nhead=nhead,
+                            nhid=nhid, nlayers=nlayers, pe=pe, dropout=dropout, batch_first=batch_first,
+                            cls_only=cls_only)
+        from torch.nn import TransformerEncoder, TransformerEncoderLayer
+        self.model_type = 'Transformer'
+        self.src_mask = None
+        self.height = height
+        self.nb_features= nb_features  #for linear transformation
+        self.encoder = nn.Sequential(nn.Linear(nb_features, ninp//4),
+                                     nn.Linear(ninp//4, ninp))
+        #self.pos_encoder = PositionalEncoding(ninp, dropout)
+        self.has_pe = pe
+        self.batch_first = batch_first
+        self.cls_only = cls_only
+        self.pos_encoder = PositionalEncoding(ninp, dropout, batch_first=batch_first)
+        encoder_layers = TransformerEncoderLayer(ninp, nhead, nhid, dropout, batch_first=batch_first)
+        self.transformer_encoder = TransformerEncoder(encoder_layers, nlayers)
+        
+        self.ninp = ninp
+        self.decoder = nn.Sequential(nn.Linear(ninp, ninp//4),
+                                     nn.Linear(ninp//4, ntoken))
+        # self.mesh_grid = MeshGrid()
+
+    def _generate_square_subsequent_mask(self, sz):
+        mask = (torch.triu(torch.ones(sz, sz)) == 1).transpose(0, 1)
+        mask = mask.float().masked_fill(mask == 0, float(
+            '-inf')).masked_fill(mask == 1, float(0.0))
+        return mask
+
+    def init_weights(self):
+        initrange = 0.1
+        self.encoder.weight.data.uniform_(-initrange, initrange)
+        self.decoder.bias.data.zero_()
+        self.decoder.weight.data.uniform_(-initrange, initrange)
+
+    def forward(self, src, padding=None):
+        # if self.src_mask is None or self.src_mask.size(0) != len(src):
+        #     device = src.device
+        #     mask = self._generate_square_subsequent_mask(len(src)).to(device)
+        #     self.src_mask = mask
+
+      #  src = self.encoder(src) * math.sqrt(self.ninp)
+       # torch.reshape(src,(-1,))
+       # print("src shape:",src.shape)
+       # print("num of features:",self.nb_features)
+        src = self.encoder(src)
+        return self.forward_embedded(src, padding)
+
+    def forward_embedded(self, src, padding=None):
+        """
+        forward from the output of self.encoder on, for callers that project the samples themselves
+        padding: [batch] bool, True for filler samples that other samples must not attend to
+        """
+        return self.decoder(self.features_embedded(src, padding))
+
+    def features(self, src, padding=None):
+        """
+        what self.decoder reads: the model up to the decoder, for adapting the decoder on its own
+        """
+        return self.features_embedded(self.encoder(src), padding)
+
+    def features_embedded(self, src, padding=None):
+        if self.has_pe:
+          src = self.pos_encoder(src)
+        #seq-first attends across the batch (dim 0), one key padding row per dim-1 column
+        #batch-first samples never see each other and need no mask
+        key_padding = None
+        if padding is not None and not self.batch_first:
+            key_padding = padding.unsqueeze(0).expand(src.size(1), -1)
+        #src.reshape()
+        if self.cls_only and not self.training:
+            return self._encode_cls(src, key_padding)
+        output = self.transformer_encoder(src, mask=self.src_mask, src_key_padding_mask=key_padding)
+        # output = self.mesh_grid(
+        #     self.transformer_encoder(src, mask=self.src_mask))
+        output = output[:,::self.height]
+        return output
+
+    def fuse_for_inference(self):
+        """
+        eval-only copy of the model in place: each linear pair of encoder and decoder becomes one
+        affine map (there is no nonlinearity between them) and, batch-first, pe is cut to the window
+        the state_dict changes layout, keep training and checkpoints on the unfused model
+        """
+        self.eval()
+        if isinstance(self.encoder, nn.Sequential):
+            self.encoder = fuse_linear_pair(*self.encoder)
+            self.decoder = fuse_linear_pair(*self.decoder)
+        #seq-first pe runs along the batch, whose size is not known in advance
+        if self.batch_first:
+            self.pos_encoder.window(self.height)
+        return self
+
+    def _encode_cls(self, src, key_padding=None):
+        """
+        transformer_encoder(src)[:, ::height] without computing the rows that slice drops (eval only)
+        """
+        if not self.batch_first:
+            #dim 1 is the attention batch here and its columns never mix, so slice before encoding
+            if key_padding is not None:
+                key_padding = key_padding[::self.height]
+            return self.transformer_encoder(src[:, ::self.height], mask=self.src_mask,
+                                            src_key_padding_mask=key_padding)
+
+        layers = self.transformer_encoder.layers
+        for layer in layers[:-1]:
+            src = layer(src, src_mask=self.src_mask)
+        #last layer: queries only for the rows read, keys and values from every position
+        last = layers[-1]
+        query = src[:, ::self.height]
+        mask = None if self.src_mask is None else self.src_mask[::self.height]
+        x = last.self_attn(query, src, src, attn_mask=mask, need_weights=False)[0]
+        x = last.norm1(query + x)
+        x = last.norm2(x + last.linear2(last.activation(last.linear1(x))))
+        return x
+
+
+class StreamingPureTran(object):
+    """
+    scoring of a live stream with a trained PureTran_torch, windows as ActStreamWindower cuts them
+    each sample goes through self.encoder once, when it arrives; the projections sit in the windower's
+    ring buffer and overlapping windows are assembled from there (positional terms depend on the position
+    inside the window, so pe is added per window by forward_embedded)
+    seq-first models attend across the windows scored together, use a batch_first model for results
+    that do not depend on how the stream is chunked
+    """
+
+    def __init__(self, model, step):
+        self.model = model.eval()
+        self.device = next(model.parameters()).device
+        self.windower = ActStreamWindower(model.ninp, model.height, step)
+
+    @torch.no_grad()
+    def push(self, samples, labels=None, subjects=None):
+        """
+        logits [#window:ntoken] of the windows completed by this chunk, with their y and u
+        """
+        x = torch.as_tensor(samples, dtype=torch.float32, device=self.device)
+        embedded = self.model.encoder(x).cpu().numpy()
+        completed = self.windower.push(embedded, labels, subjects)
+        if not completed:
+            return torch.zeros(0, self.model.hparams['ntoken'], device=self.device), [], []
+        windows, ys, us = (list(column) for column in zip(*completed))
+        src = torch.from_numpy(np.stack(windows)).to(self.device)
+        return self.model.forward_embedded(src).reshape(len(windows), -1), ys, us
+
+
+def fuse_linear_pair(first, second):
+    """
+    one nn.Linear computing second(first(x))
+    """
+    fused = nn.Linear(first.in_features, second.out_features)
+    with torch.no_grad():
+        w1, b1 = first.weight.double(), first.bias.double()
+        w2, b2 = second.weight.double(), second.bias.double()
+        fused.weight.copy_(w2 @ w1)
+        fused.bias.copy_(w2 @ b1 + b2)
+    return fused.to(first.weight.device, first.weight.dtype)
+
+
+def quantize_for_cpu(model):
+    """
+    fused, dynamic int8 copy of a trained model for CPU scoring: every nn.Linear (the nhid feed-forward of
+    each encoder layer and the fused encoder/decoder) stores int8 weights and quantizes its input per batch
+    the attention projections stay fp32, nn.MultiheadAttention does not run them through nn.Linear
+    """
+    model = copy.deepcopy(model).cpu().float().fuse_for_inference()
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def export_scripted(model, fn, batch_size=64):
+    """
+    write the fused model as a frozen TorchScript file that scripted_model.load_scripted can score with torch
+    alone; the hyperparameters travel inside it as hparams.json
+    the model is traced on a [batch_size:height:nb_features] example, any batch size works afterwards
+    """
+    model = copy.deepcopy(model).cpu().float().fuse_for_inference()
+    example = torch.zeros(batch_size, model.height, model.nb_features)
+    with torch.no_grad(), warnings.catch_warnings():
+        #the tracer warns about the fast-path checks of nn.TransformerEncoderLayer, they are constant in eval
+        warnings.simplefilter('ignore', torch.jit.TracerWarning)
+        frozen = torch.jit.freeze(torch.jit.trace(model, example))
+    torch.jit.save(frozen, fn, _extra_files={'hparams.json': json.dumps(model.hparams)})
+
+
+def load_puretran_torch(state, batch_first=True, map_location=None, **hparams):
+    """
+    PureTran_torch(**hparams, batch_first=batch_first) with the weights of a checkpoint of either mode
+    state is a state_dict or the path torch.save wrote it to; the parameter and buffer layout does not
+    depend on the mode, so seq-first checkpoints load as they are. their predictions do change, since
+    the seq-first model mixed the samples of a batch
+    """
+    if isinstance(state, str):
+        state = torch.load(state, map_location=map_location)
+    model = PureTran_torch(batch_first=batch_first, **hparams)
+    model.load_state_dict(state)
+    return model
@@ -0,0 +1,112 @@
+#fp32 vs dynamic int8 (quantize_for_cpu) on the LOPO target sets: accuracy, CPU latency and model size
+#uses the best checkpoint tradition_lopo.py stored for every target subject
+
+import io
+import os
+import time
+from glob import glob
+import numpy as np
+import torch
+from window_cache import load_subject_windows
+from data_utils import shuffled_prefix
+from puretran_torch import PureTran_torch, quantize_for_cpu
+
+path = '/content/drive/MyDrive/research/Multi-agent-Attentional-Activity-Recognition/Data_/'
+
+# dict: [filename, sub, class]
+datasets_dict = {'MH8': ['MHEALTH_8class', 10, 8],
+                 'MH6': ['MHEALTH_balance', 10, 6],
+                 'PMP8': ['PAMAP2_8class', 8, 8],
+                 'PMP6': ['PAMAP2_Protocol_6_classes_balance', 8, 6],
+                 'MARS': ['MARS', 8, 5]}
+
+dataset = 'PMP6'
+#tradition_lopo.py stores the checkpoints of target i in weights_prefix + str(i)
+weights_prefix = './tradition_tran' + 'PMP0'
+target_size = 2000
+window_size = 20
+step = 10
+
+file_name = datasets_dict[dataset][0]
+nb_subjects = datasets_dict[dataset][1]
+nb_classes = datasets_dict[dataset][2]
+
+#transformer model, as trained
+emsize = 120
+nhid = 2048
+nlayers = 2
+nhead = 3
+dropout = 0.1
+has_pe = False
+
+#latency is measured on batches of this many windows
+latency_batches = [1, 100, 2000]
+repeat = 10
+
+torch.set_grad_enabled(False)
+
+
+def cond(x): return float(x.split('/')[-1].split('_')[-1][:-4])
+
+
+def accuracy(model, x, y):
+    return (model(x).reshape(-1, nb_classes).argmax(1) == y).float().mean().item()
+
+
+def latency(model, x):
+    model(x)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        model(x)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def state_size(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+source_range = list(range(nb_subjects))
+subject_windows = load_subject_windows(path + file_name + '.mat', file_name, window_size, step, source_range, columnar=True)
+
+results = []
+for target_id in source_range:
+    all_model_fn = sorted(glob(weights_prefix + str(target_id) + '/*.pth'), key=cond)
+    if not all_model_fn:
+        print('no checkpoint for target', target_id)
+        continue
+    fn = all_model_fn[-1]
+
+    target_x, target_y, target_u = subject_windows.fold([target_id])
+    target_x, target_y, target_u = shuffled_prefix((target_x, target_y, target_u), target_size, seed=1)
+    target_x = torch.tensor(target_x).float()
+    target_y = torch.tensor(target_y).long()
+
+    model = PureTran_torch(height = window_size, nb_features = target_x.shape[-1],ntoken = nb_classes, ninp = emsize, nhead = nhead, nhid = nhid, nlayers = nlayers,
+                 pe = has_pe,dropout=dropout)
+    model.load_state_dict(torch.load(fn, map_location='cpu'))
+    model.eval()
+    quantized = quantize_for_cpu(model)
+
+    acc_fp32 = accuracy(model, target_x, target_y)
+    acc_int8 = accuracy(quantized, target_x, target_y)
+    results.append((acc_fp32, acc_int8))
+    print('target:', target_id, '\tmodel:', os.path.basename(fn),
+          '\tfp32 acc:', f'{acc_fp32:.3}', '\tint8 acc:', f'{acc_int8:.3}', '\tdelta:', f'{acc_int8 - acc_fp32:+.3}')
+
+if results:
+    results = np.array(results)
+    print('mean fp32 acc:', f'{results[:, 0].mean():.3}', '\tmean int8 acc:', f'{results[:, 1].mean():.3}',
+          '\tmean delta:', f'{(results[:, 1] - results[:, 0]).mean():+.3}')
+
+    print('state_dict size: fp32', f'{state_size(model) / 2**20:.2f} MiB',
+          '\tint8', f'{state_size(quantized) / 2**20:.2f} MiB')
+    for batch in latency_batches:
+        x = target_x[:batch]
+        t_fp32 = latency(model, x)
+        t_int8 = latency(quantized, x)
+        print('batch:', batch, '\tfp32:', f'{t_fp32 * 1e3:.2f} ms', '\tint8:', f'{t_int8 * 1e3:.2f} ms',
+              '\tspeedup:', f'{t_fp32 / t_int8:.2f}x')
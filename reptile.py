@@ -0,0 +1,162 @@
+#Reptile meta-update on a flat copy of the model parameters, the inner optimizer and batched task groups
+
+import math
+import torch
+import torch.nn.functional as F
+
+
+class FlatReptile(object):
+    """
+    the parameters of model become views into one contiguous buffer, with a preallocated snapshot next to it
+    begin_task() copies the buffer into the snapshot, end_task(outerstepsize) moves the parameters to
+    before + (after - before) * outerstepsize with a single in-place lerp; nothing is allocated per task
+    build it after model.to(device) (which would replace the views) and before creating optimizers
+    """
+
+    def __init__(self, model):
+        self.params = [p for p in model.parameters()]
+        with torch.no_grad():
+            self.flat = torch.cat([p.reshape(-1) for p in self.params])
+        offset = 0
+        for p in self.params:
+            p.data = self.flat[offset: offset + p.numel()].view_as(p)
+            offset += p.numel()
+        self.snapshot = torch.empty_like(self.flat)
+
+    def begin_task(self):
+        self.snapshot.copy_(self.flat)
+
+    @torch.no_grad()
+    def end_task(self, outerstepsize):
+        #flat + (1 - eps) * (snapshot - flat) == snapshot + (flat - snapshot) * eps
+        self.flat.lerp_(self.snapshot, 1 - outerstepsize)
+
+
+class InnerOptimizer(object):
+    """
+    one AdamW for every task of a Reptile run instead of a new one per task
+    begin_task(task_id) returns it ready for the task: its moment buffers are zeroed in place (what a fresh
+    AdamW would start from) or, with per_task, set to the moments task_id had at the end of its last visit,
+    kept between visits in compact_dtype
+    uses the fused AdamW kernel on cuda and the foreach one elsewhere
+    """
+
+    def __init__(self, params, lr, per_task=False, compact_dtype=torch.bfloat16):
+        params = list(params)
+        fused = all(p.is_cuda for p in params)
+        self.optimizer = torch.optim.AdamW(params, lr=lr, fused=fused, foreach=None if fused else True)
+        self.per_task = per_task
+        self.compact_dtype = compact_dtype
+        self.saved = {}
+        self.current = None
+
+    def begin_task(self, task_id=None):
+        if self.per_task and self.current is not None:
+            self.saved[self.current] = [(state['step'].item(),
+                                         state['exp_avg'].to(self.compact_dtype),
+                                         state['exp_avg_sq'].to(self.compact_dtype))
+                                        for state in self._states()]
+        self.current = task_id
+
+        if self.per_task and task_id in self.saved:
+            for state, (step, exp_avg, exp_avg_sq) in zip(self._states(), self.saved[task_id]):
+                state['step'].fill_(step)
+                state['exp_avg'].copy_(exp_avg)
+                state['exp_avg_sq'].copy_(exp_avg_sq)
+        else:
+            for state in self._states():
+                state['step'].zero_()
+                state['exp_avg'].zero_()
+                state['exp_avg_sq'].zero_()
+        return self.optimizer
+
+    def _states(self):
+        #created by the first step, in parameter order
+        return [self.optimizer.state[p] for group in self.optimizer.param_groups for p in group['params']
+                if p in self.optimizer.state]
+
+
+class BatchedReptile(object):
+    """
+    Reptile over groups of tasks: run(tasks) trains one copy of the meta-weights per task at the same time
+    (parameters stacked along a task dim, torch.func.vmap over functional_call of the model), then moves
+    the model by outerstepsize times the mean of their deltas
+    every copy takes the inner steps of the serial loop: cross entropy, clip_grad_norm_(max_grad_norm) and
+    torch.optim.AdamW's update with its default hyperparameters; tasks of different size are padded and
+    the filler samples are masked out of the loss and, seq-first, out of attention
+    """
+
+    def __init__(self, model, lr, max_grad_norm=2.0, betas=(0.9, 0.999), eps=1e-8, weight_decay=1e-2):
+        self.model = model
+        self.lr = lr
+        self.max_grad_norm = max_grad_norm
+        self.betas = betas
+        self.eps = eps
+        self.weight_decay = weight_decay
+        self.params = dict(model.named_parameters())
+        self.buffers = dict(model.named_buffers())
+        self.step_grad = torch.func.vmap(torch.func.grad(self._loss, has_aux=True), randomness='different')
+
+    def _loss(self, params, x, y, padding):
+        outputs = torch.func.functional_call(self.model, (params, self.buffers), (x,), {'padding': padding})
+        outputs = outputs.reshape(y.shape[0], -1).float()
+        valid = (~padding).float()
+        loss = (F.cross_entropy(outputs, y, reduction='none') * valid).sum() / valid.sum()
+        acc = ((outputs.argmax(1) == y).float() * valid).sum() / valid.sum()
+        return loss, (loss.detach(), acc)
+
+    def pad(self, tasks):
+        """
+        stacked [task:max_size:...] x and y of a list of (x, y) and the [task:max_size] padding mask
+        """
+        size = max(len(x) for x, _ in tasks)
+        x = torch.stack([F.pad(x, (0, 0) * (x.dim() - 1) + (0, size - len(x))) for x, _ in tasks])
+        y = torch.stack([F.pad(y, (0, size - len(y))) for _, y in tasks])
+        padding = torch.stack([torch.arange(size, device=y.device) >= len(t) for _, t in tasks])
+        return x, y, padding
+
+    def run(self, tasks, innerepochs, outerstepsize):
+        """
+        tasks: list of (x, y) tensors; returns the [innerepochs:task] losses and accuracies of the inner steps
+        """
+        params, losses, accs = self.adapt(tasks, innerepochs)
+        with torch.no_grad():
+            for name, p in self.params.items():
+                p.lerp_(params[name].mean(0), outerstepsize)
+        return losses, accs
+
+    def adapt(self, tasks, innerepochs):
+        """
+        the inner loops alone: returns the {name: [task:...]} trained parameters, the model is left as it was,
+        and the [innerepochs:task] losses and accuracies
+        """
+        x, y, padding = self.pad(tasks)
+        nb_tasks = len(tasks)
+        with torch.no_grad():
+            params = {name: p.detach().unsqueeze(0).repeat(nb_tasks, *[1] * p.dim())
+                      for name, p in self.params.items()}
+        exp_avg = {name: torch.zeros_like(p) for name, p in params.items()}
+        exp_avg_sq = {name: torch.zeros_like(p) for name, p in params.items()}
+        beta1, beta2 = self.betas
+        losses, accs = [], []
+
+        for step in range(1, innerepochs + 1):
+            grads, (loss, acc) = self.step_grad(params, x, y, padding)
+            losses.append(loss)
+            accs.append(acc)
+            with torch.no_grad():
+                #clip_grad_norm_ per task
+                norms = torch.stack([g.reshape(nb_tasks, -1).pow(2).sum(1) for g in grads.values()]).sum(0).sqrt()
+                clip = (self.max_grad_norm / (norms + 1e-6)).clamp(max=1.0)
+                #AdamW, as torch.optim.AdamW computes it
+                bias_correction1 = 1 - beta1 ** step
+                bias_correction2_sqrt = math.sqrt(1 - beta2 ** step)
+                for name, p in params.items():
+                    g = grads[name] * clip.view(-1, *[1] * (p.dim() - 1))
+                    p.mul_(1 - self.lr * self.weight_decay)
+                    exp_avg[name].lerp_(g, 1 - beta1)
+                    exp_avg_sq[name].mul_(beta2).addcmul_(g, g, value=1 - beta2)
+                    denom = (exp_avg_sq[name].sqrt() / bias_correction2_sqrt).add_(self.eps)
+                    p.addcdiv_(exp_avg[name], denom, value=-self.lr / bias_correction1)
+
+        return params, torch.stack(losses), torch.stack(accs)
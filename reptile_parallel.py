@@ -0,0 +1,175 @@
+#process-parallel Reptile: workers train tasks on copies of shared meta-weights, the coordinator applies deltas
+
+import queue
+import traceback
+import torch
+import torch.multiprocessing as mp
+import torch.nn.functional as F
+from puretran_torch import PureTran_torch
+from reptile import FlatReptile, InnerOptimizer
+
+
+def _worker(hparams, tasks, shared, version, lock, task_queue, result_queue, innerepochs, innerstepsize,
+            max_grad_norm, seed):
+    seq = None
+    try:
+        torch.set_num_threads(1)
+        torch.manual_seed(seed)
+        model = PureTran_torch(**hparams).train()
+        reptile = FlatReptile(model)
+        nb_classes = hparams['ntoken']
+        inner_optimizer = InnerOptimizer(model.parameters(), innerstepsize)
+
+        while True:
+            item = task_queue.get()
+            if item is None:
+                break
+            seq, task_num = item
+            with lock:
+                reptile.flat.copy_(shared)
+                start_version = version.value
+            reptile.begin_task()
+            optimizer = inner_optimizer.begin_task(task_num)
+
+            x, y = tasks[task_num]
+            losses = torch.zeros(innerepochs)
+            accs = torch.zeros(innerepochs)
+            for i in range(innerepochs):
+                optimizer.zero_grad()
+                outputs = model(x).reshape(-1, nb_classes).float()
+                loss = F.cross_entropy(outputs, y)
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(model.parameters(), max_grad_norm)
+                optimizer.step()
+                losses[i] = loss.detach()
+                accs[i] = (outputs.argmax(1) == y).float().mean()
+
+            delta = reptile.flat - reptile.snapshot
+            result_queue.put((seq, task_num, start_version, delta, losses, accs))
+    except Exception:
+        #the coordinator re-raises it; exiting silently would leave it waiting on result_queue forever
+        result_queue.put((seq, None, traceback.format_exc()))
+
+
+class ParallelReptile(object):
+    """
+    Reptile with nb_workers CPU processes: each pulls a task, copies the meta-weights from shared memory,
+    runs the inner AdamW loop (one torch thread per worker) and sends back its weight delta, which the
+    coordinator applies as weights += delta * outerstepsize as soon as it arrives
+    with max_staleness, at most max_staleness + 1 tasks are in flight and their deltas are applied in the
+    order the tasks were handed out, so every delta lands on weights that moved by at most max_staleness
+    other updates since its task started; max_staleness=0 is serial Reptile
+    reptile is the FlatReptile of model: its flat buffer is moved to shared memory in place, so model,
+    reptile and the workers all see the same weights and the coordinator can evaluate model between updates
+    tasks: list of (x, y) CPU tensors, moved to shared memory once
+    """
+
+    def __init__(self, model, reptile, tasks, nb_workers, innerepochs, innerstepsize, max_staleness=None,
+                 max_grad_norm=2.0, seed=1):
+        device = next(model.parameters()).device
+        if device.type != 'cpu':
+            #share_memory_() is a no-op on cuda and forked workers cannot use the parent's cuda context
+            raise ValueError(f'ParallelReptile trains on CPU worker processes, the model is on {device}; '
+                             f'move it to the CPU first')
+        params = list(model.parameters())
+        if len(params) != len(reptile.params) or any(p is not q for p, q in zip(params, reptile.params)):
+            raise ValueError('reptile is not the FlatReptile of model')
+        self.model = model
+        #flattening model again would leave reptile's flat and snapshot detached from its parameters
+        self.shared = reptile.flat.share_memory_()
+        self.max_in_flight = nb_workers if max_staleness is None else min(nb_workers, max_staleness + 1)
+        self.ordered = max_staleness is not None
+        #how often run() checks that the workers are alive while it waits for a result
+        self.poll_seconds = 1.0
+
+        #fork, as DataLoader workers do: spawn would re-run the (unguarded) training scripts in every worker
+        ctx = mp.get_context('fork')
+        self.version = ctx.Value('l', 0)
+        self.lock = ctx.Lock()
+        self.task_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        tasks = [(x.float().share_memory_(), y.long().share_memory_()) for x, y in tasks]
+        self.workers = [ctx.Process(target=_worker,
+                                    args=(model.hparams, tasks, self.shared, self.version, self.lock,
+                                          self.task_queue, self.result_queue, innerepochs, innerstepsize,
+                                          max_grad_norm, seed + i),
+                                    daemon=True)
+                        for i in range(nb_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def run(self, task_order, outerstepsize):
+        """
+        meta-train over task_order (task indices, repeats allowed); yields (task_num, staleness, losses, accs)
+        after each update, in the order they were applied
+        outerstepsize is a float or a function called before every update, so callers can decay it between yields
+        """
+        pending = enumerate(task_order)
+        in_flight = 0
+        for seq, task_num in pending:
+            self.task_queue.put((seq, int(task_num)))
+            in_flight += 1
+            if in_flight == self.max_in_flight:
+                break
+
+        finished = {}
+        next_seq = 0
+        while in_flight:
+            seq, result = self._result()
+            finished[seq] = result
+            if self.ordered:
+                #a task that finishes early waits for the older ones, or it would push them further behind
+                ready = []
+                while next_seq in finished:
+                    ready.append(finished.pop(next_seq))
+                    next_seq += 1
+            else:
+                ready = [finished.pop(seq)]
+
+            for task_num, start_version, delta, losses, accs in ready:
+                in_flight -= 1
+                step = outerstepsize() if callable(outerstepsize) else outerstepsize
+                with self.lock:
+                    self.shared.add_(delta, alpha=step)
+                    staleness = self.version.value - start_version
+                    self.version.value += 1
+                next_task = next(pending, None)
+                if next_task is not None:
+                    self.task_queue.put((next_task[0], int(next_task[1])))
+                    in_flight += 1
+                yield task_num, staleness, losses, accs
+
+    def _result(self):
+        """
+        next (seq, result) from the workers; a worker's exception is re-raised here, and a worker that
+        died without one (killed, out of memory) is noticed by polling is_alive
+        """
+        dead = False
+        while True:
+            try:
+                seq, *result = self.result_queue.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                if dead:
+                    self._terminate()
+                    codes = [worker.exitcode for worker in self.workers if worker.exitcode is not None]
+                    raise RuntimeError(f'a ParallelReptile worker exited (exit codes {codes}) during a task')
+                #one more poll so an exception it sent before exiting arrives first
+                dead = not all(worker.is_alive() for worker in self.workers)
+                continue
+            if result[0] is None:
+                self._terminate()
+                task = '' if seq is None else f' on task #{seq}'
+                raise RuntimeError(f'a ParallelReptile worker failed{task}:\n{result[1]}')
+            return seq, result
+
+    def _terminate(self):
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    def close(self):
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join()
@@ -0,0 +1,23 @@
+#scoring with PureTran_torch files written by puretran_torch.export_scripted
+#only torch is imported, the model code and its hyperparameter globals are not needed
+
+import json
+import torch
+
+
+def load_scripted(fn, map_location='cpu'):
+    """
+    the frozen model (call it under torch.no_grad()) and the hyperparameters it was built with
+    """
+    extra_files = {'hparams.json': ''}
+    model = torch.jit.load(fn, map_location=map_location, _extra_files=extra_files)
+    return model, json.loads(extra_files['hparams.json'])
+
+
+def score(model, x):
+    """
+    model(x) without autograd and without the profiling runs TorchScript makes on the first calls,
+    which would otherwise cost several times a steady-state call at startup
+    """
+    with torch.no_grad(), torch.jit.optimized_execution(False):
+        return model(x)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from act_stream import ActStreamWindower
+from data_utils import get_act_time_sequences
+
+
+def make_stream(seed=1):
+    rng = np.random.RandomState(seed)
+    #short runs (some shorter than a window, one starting at row 1) and a subject change
+    lengths = [1, 7, 3, 25, 2, 40, 9, 30]
+    labels = np.repeat(rng.randint(0, 3, size=len(lengths)), lengths)
+    subjects = np.repeat([0, 0, 0, 0, 1, 1, 1, 1], lengths)
+    features = rng.randn(labels.shape[0], 5).astype(np.float32)
+    return features, labels, subjects
+
+
+@pytest.mark.parametrize('window_size, step', [(4, 2), (6, 6), (3, 5)])
+@pytest.mark.parametrize('chunk', [1, 4, 1000])
+def test_push_matches_get_act_time_sequences(window_size, step, chunk):
+    features, labels, subjects = make_stream()
+    X, y, u = get_act_time_sequences(np.column_stack([features, labels, subjects]), window_size, step)
+
+    windower = ActStreamWindower(features.shape[1], window_size, step)
+    windows = []
+    for i in range(0, len(features), chunk):
+        windows += list(windower.push(features[i: i + chunk], labels[i: i + chunk], subjects[i: i + chunk]))
+
+    assert len(windows) == len(X)
+    np.testing.assert_array_equal(np.stack([window for window, _, _ in windows]), X.astype(np.float32))
+    np.testing.assert_array_equal([window_y for _, window_y, _ in windows], y)
+    np.testing.assert_array_equal([window_u for _, _, window_u in windows], u)
+
+
+def test_push_stores_samples_without_iterating():
+    features, labels, subjects = make_stream()
+    windower = ActStreamWindower(features.shape[1], 4, 2)
+    windower.push(features[:50], labels[:50], subjects[:50])
+    assert windower.nb_seen == 50
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from data_utils import get_act_time_sequences
+
+
+def make_recording(seed=1):
+    rng = np.random.RandomState(seed)
+    lengths = [30, 5, 41, 12, 26]
+    labels = np.repeat(rng.randint(0, 3, size=len(lengths)), lengths)
+    subjects = np.repeat([0, 0, 0, 1, 1], lengths)
+    return np.column_stack([rng.randn(labels.shape[0], 4), labels, subjects])
+
+
+@pytest.mark.parametrize('index', [0, 3, -1, np.int64(2), np.array(1), slice(1, 7, 2), slice(None), [4, 0, 4],
+                                   np.array([[1, 2], [3, 0]]), np.arange(5) % 2 == 0])
+def test_act_windows_indexing_matches_copy(index):
+    data = make_recording()
+    X_copy, y_copy, u_copy = get_act_time_sequences(data, 10, 5)
+    X, y, u = get_act_time_sequences(data, 10, 5, as_view=True)
+    if isinstance(index, np.ndarray) and index.dtype == bool:
+        index = np.resize(index, len(X_copy))
+
+    assert X[index].shape == X_copy[index].shape
+    np.testing.assert_array_equal(X[index], X_copy[index].astype(np.float32))
+    np.testing.assert_array_equal(y, y_copy)
+    np.testing.assert_array_equal(u, u_copy)
+
+
+def test_act_windows_array():
+    data = make_recording()
+    X_copy, _, _ = get_act_time_sequences(data, 10, 5)
+    X, _, _ = get_act_time_sequences(data, 10, 5, as_view=True)
+    assert len(X) == len(X_copy)
+    np.testing.assert_array_equal(np.asarray(X), X_copy.astype(np.float32))
+
+
+def test_act_time_sequences_without_windows():
+    data = make_recording()
+    for rows in [data[:0], data[:9]]:
+        X, y, u = get_act_time_sequences(rows, 10, 5)
+        assert len(X) == len(y) == len(u) == 0
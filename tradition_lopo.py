@@ -96,14 +96,14 @@ def random_get_support(source_X, source_y, support_size):
 
     return np.array(support_x),np.array(support_y)
 
-import scipy.io as sc
 import numpy as np
-from functions import *
+from data_utils import *
+from window_cache import load_act_time_sequences, load_subject_windows
 #from act_models import *
 #from gram_model import *
 # from gcram_model import *
-from grcam_model import *
-from puretran import *
+from puretran_torch import *
+from metrics import RunningMean
 import random
 import os
 import torch.nn.functional as F
@@ -176,8 +176,6 @@ window_size = 20
 step = 10
 
 file_name = datasets_dict[dataset][0]
-file_data = sc.loadmat(path + file_name + '.mat')
-file_data = file_data[file_name]
 
 nb_subjects = datasets_dict[dataset][1]
 nb_classes = datasets_dict[dataset][2]
@@ -205,12 +203,14 @@ source_range = list(range(nb_subjects))
 print("source range: ",source_range)
 
 test_acc_total = []
+train_metrics = RunningMean('loss', 'acc')
 # for MH, PMP, MARS dataset
   
 # ts stores the time in seconds
 ts1 = time.time()
 if dataset != 'UCI':
     #leave one person out
+    subject_windows = load_subject_windows(path + file_name + '.mat', file_name, window_size, step, source_range, columnar=True)
    
     for target_id in source_range:
         learning_rate = o_learning_rate
@@ -221,8 +221,8 @@ if dataset != 'UCI':
         print("source_copy range:",source_range_copy)
         target_range = [target_id]
 
-        source_data = get_act_data(file_data, source_range_copy)
-        target_data = get_act_data(file_data, target_range)
+        source_x, source_y, source_u = subject_windows.fold(source_range_copy)
+        target_x, target_y, target_u = subject_windows.fold(target_range)
 
         # print("source range copy: ",source_range_copy)
         # print("target id: ",target_id)
@@ -230,17 +230,12 @@ if dataset != 'UCI':
 
         user_id = [i for i in range(nb_subjects)]
 
-
-        source_x, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-        target_x, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
-
         nb_feature = source_x.shape[-1]
 
 
-        source_x, source_y, source_u = seed_shuffle(source_x, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-        target_x, target_y, target_u = seed_shuffle(target_x, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
+        source_x, source_y, source_u = shuffled_prefix((source_x, source_y, source_u), source_size, seed=1)
+        target_x, target_y, target_u = shuffled_prefix((target_x, target_y, target_u), target_size, seed=1)
 
-        source_x, source_y, source_u = source_x[ :source_size], source_y[:source_size], source_u[:source_size]
         total_num_source = source_x.shape[0]
         
         num_train = int(total_num_source * 1)
@@ -250,7 +245,6 @@ if dataset != 'UCI':
        # print("total for eval:",eval_x.shape)
         source_x, source_y, source_u = source_x[: num_train], source_y[: num_train], source_u[: num_train]
        # print("total for training:",source_x.shape)
-        target_x, target_y, target_u = target_x[: target_size], target_y[: target_size], target_u[: target_size]
         #print("total for test:",target_x.shape)
 
         #the path to store and restore the model
@@ -282,8 +276,7 @@ if dataset != 'UCI':
         for epoch in range(1, epoch+1):
 
             model.train()
-            train_acc = []
-            train_losses = []
+            train_metrics.reset()
 
             for b in range(source_x.shape[0] // batch_size):
                 source_batch_x = source_x[batch_size * b: batch_size * (b + 1)]
@@ -298,10 +291,8 @@ if dataset != 'UCI':
                 loss.backward()
                 torch.nn.utils.clip_grad_norm_(model.parameters(), max_gradient_norm)
                 optimizer.step()
-                train_losses.append(loss.item())
           # print("outputs:",outputs.argmax(1))
-                acc = (outputs.argmax(1) == source_batch_y).float().mean().item()
-                train_acc.append(acc)
+                train_metrics.update(loss = loss, acc = (outputs.argmax(1) == source_batch_y).float().mean())
 
         #update the outerstepsize
                 learning_rate *= learning_rate_decay_factor
@@ -311,10 +302,11 @@ if dataset != 'UCI':
        
             valid_after_acc = validation(model,quary_x,quary_y)
             test_acc = validation(model,target_x,target_y)
+            train = train_metrics.result()
             print('target:',target_id,
                 'epoch:', epoch, 'step:', step, '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\tvalidation acc:',
+                  f'{train["loss"]:.3}', '\ttraining acc:',
+                  f'{train["acc"]:.3}', '\tvalidation acc:',
                   f'{np.mean(valid_after_acc):.3}','\t test acc:',
                   f'{np.mean(test_acc):.3}')
             if count != 50:
@@ -361,25 +353,17 @@ if dataset != 'UCI':
 
 if dataset == 'UCI':
     print('dataset is UCI')
-    source_data = sc.loadmat(path + 'UCI_train_raw' + '.mat')
-    source_data = source_data['UCI_train_raw']
-
-    target_data = sc.loadmat(path + 'UCI_test_raw' + '.mat')
-    target_data = target_data['UCI_test_raw']
+    source_x, source_y, source_u = load_act_time_sequences(path + 'UCI_train_raw' + '.mat', 'UCI_train_raw', window_size, step, columnar=True)
+    target_x, target_y, target_u = load_act_time_sequences(path + 'UCI_test_raw' + '.mat', 'UCI_test_raw', window_size, step, columnar=True)
     user_id = [1,3,5,6,7,8,11,14,15,16,17,19,21,22,23,25,26,27,28,29,30]
     target_id = 0 #no 0 id in target_data
 
     target_all = [2, 4, 9, 10, 12, 13, 18, 20, 24]
 
-    source_x, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-    target_x, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
-
     nb_feature = source_x.shape[-1]
 
-    source_x, source_y, source_u = seed_shuffle(source_x, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-    target_x, target_y, target_u = seed_shuffle(target_x, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
-
-    source_x, source_y, source_u = source_x[ :source_size], source_y[:source_size], source_u[:source_size]
+    source_x, source_y, source_u = shuffled_prefix((source_x, source_y, source_u), source_size, seed=1)
+    target_x, target_y, target_u = shuffled_prefix((target_x, target_y, target_u), target_size, seed=1)
 
     total_num_source = source_x.shape[0]
     print("total for training:",total_num_source)
@@ -388,8 +372,6 @@ if dataset == 'UCI':
         #use 70% to train, 30% to do model selection
     eval_x,eval_y,eval_u = source_x[num_train:], source_y[num_train:], source_u[num_train:]
     source_x, source_y, source_u = source_x[: num_train], source_y[: num_train], source_u[: num_train]
-    
-    target_x, target_y, target_u = target_x[: target_size], target_y[: target_size], target_u[: target_size]
 
 
     #the path to store and restore the model
@@ -425,8 +407,7 @@ if dataset == 'UCI':
     for epoch in range(1, epoch+1):
 
         model.train()
-        train_acc = []
-        train_losses = []
+        train_metrics.reset()
 
         learning_rate = o_learning_rate
 
@@ -444,10 +425,8 @@ if dataset == 'UCI':
             loss.backward()
             torch.nn.utils.clip_grad_norm_(model.parameters(), max_gradient_norm)
             optimizer.step()
-            train_losses.append(loss.item())
           # print("outputs:",outputs.argmax(1))
-            acc = (outputs.argmax(1) == source_batch_y).float().mean().item()
-            train_acc.append(acc)
+            train_metrics.update(loss = loss, acc = (outputs.argmax(1) == source_batch_y).float().mean())
 
 
         #update the outerstepsize
@@ -458,10 +437,11 @@ if dataset == 'UCI':
        # valid_after_acc = validation(model, arc_dataset)
         valid_after_acc = validation(model,quary_x,quary_y)
         test_acc = validation(model,target_x,target_y)
+        train = train_metrics.result()
         print(
                 'epoch:', epoch, 'step:', step, '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\tvalidation acc:',
+                  f'{train["loss"]:.3}', '\ttraining acc:',
+                  f'{train["acc"]:.3}', '\tvalidation acc:',
                   f'{np.mean(valid_after_acc):.3}','\t test acc:',
                   f'{np.mean(test_acc):.3}')
 
@@ -1,12 +1,12 @@
 
-import scipy.io as sc
 import numpy as np
-from functions import *
+from data_utils import *
+from window_cache import load_act_time_sequences
 #from act_models import *
 #from gram_model import *
 # from gcram_model import *
-from grcam_model import *
-from puretran import *
+from puretran_torch import *
+from metrics import RunningMean
 import random
 import os
 import torch.nn.functional as F
@@ -106,8 +106,6 @@ glimpse_time_down_scale = 8
 glimpse_location_down_scale = 8
 
 file_name = datasets_dict[dataset][0]
-file_data = sc.loadmat(path + file_name + '.mat')
-file_data = file_data[file_name]
 
 nb_subjects = datasets_dict[dataset][1]
 nb_classes = datasets_dict[dataset][2]
@@ -120,31 +118,24 @@ rem = [1,2]
 #   source_range.remove(i)
 target_range = [target_id]
 
-source_data = get_act_data(file_data, source_range)
-target_data = get_act_data(file_data, target_range)
-
 user_id = [i for i in range(nb_subjects)]
 if dataset == 'UCI':
     print('dataset is UCI')
-    source_data = sc.loadmat(path + 'UCI_train_raw' + '.mat')
-    source_data = source_data['UCI_train_raw']
-
-    target_data = sc.loadmat(path + 'UCI_test_raw' + '.mat')
-    target_data = target_data['UCI_test_raw']
+    source_x, source_y, source_u = load_act_time_sequences(path + 'UCI_train_raw' + '.mat', 'UCI_train_raw', window_size, step, columnar=True)
+    target_x, target_y, target_u = load_act_time_sequences(path + 'UCI_test_raw' + '.mat', 'UCI_test_raw', window_size, step, columnar=True)
     user_id = [1,3,5,7,8,11,14,15,16,17,19,21,22,23,25,26,27,28,29.30]
-source_x, source_y, source_u = get_act_time_sequences(source_data, window_size, step)
-target_x, target_y, target_u = get_act_time_sequences(target_data, window_size, step)
+else:
+    source_x, source_y, source_u = load_act_time_sequences(path + file_name + '.mat', file_name, window_size, step, source_range, columnar=True)
+    target_x, target_y, target_u = load_act_time_sequences(path + file_name + '.mat', file_name, window_size, step, target_range, columnar=True)
 
 nb_feature = source_x.shape[-1]
 
 # source_X = source_X.reshape([source_X.shape[0], -1])
 # target_X = target_X.reshape([target_X.shape[0], -1])
 
-source_x, source_y, source_u = seed_shuffle(source_x, 1), seed_shuffle(source_y, 1), seed_shuffle(source_u, 1)
-target_x, target_y, target_u = seed_shuffle(target_x, 1), seed_shuffle(target_y, 1), seed_shuffle(target_u, 1)
+source_x, source_y, source_u = shuffled_prefix((source_x, source_y, source_u), source_size, seed=1)
+target_x, target_y, target_u = shuffled_prefix((target_x, target_y, target_u), target_size, seed=1)
 
-source_x, source_y, source_u = source_x[: source_size], source_y[: source_size], source_u[: source_size]
-target_x, target_y, target_u = target_x[: target_size], target_y[: target_size], target_u[: target_size]
 # print(target_X.shape)
 
 # model
@@ -265,6 +256,7 @@ max_gradient_norm = 5.0
 
 
 best_val_acc = 0
+train_metrics = RunningMean('loss', 'acc')
 epoch = 2000
 batch_size = 2000
 
@@ -276,8 +268,7 @@ for epoch in range(1, epoch+1):
     
        
     model.train()
-    train_acc = []
-    train_losses = []
+    train_metrics.reset()
 
     for b in range(source_x.shape[0] // batch_size):
         source_batch_x = source_x[batch_size * b: batch_size * (b + 1)]
@@ -295,10 +286,8 @@ for epoch in range(1, epoch+1):
         loss.backward()
         torch.nn.utils.clip_grad_norm_(model.parameters(), max_gradient_norm)
         optimizer.step()
-        train_losses.append(loss.item())
           # print("outputs:",outputs.argmax(1))
-        acc = (outputs.argmax(1) == source_batch_y).float().mean().item()
-        train_acc.append(acc)
+        train_metrics.update(loss = loss, acc = (outputs.argmax(1) == source_batch_y).float().mean())
 
 
         #update the outerstepsize
@@ -308,9 +297,10 @@ for epoch in range(1, epoch+1):
         #outerstepsize  =  (outerstepsize >= min_learning_rate)? outerstepsize*learning_rate_decay_factor :min_learning_rate
       
     valid_after_acc = validation(model,quary_x,quary_y)
+    train = train_metrics.result()
     print('epoch:', epoch, 'step:', step, '\ttraining loss:',
-                  f'{np.mean(train_losses):.3}', '\ttraining acc:',
-                  f'{np.mean(train_acc):.3}', '\tvalidation acc:',
+                  f'{train["loss"]:.3}', '\ttraining acc:',
+                  f'{train["acc"]:.3}', '\tvalidation acc:',
                   f'{np.mean(valid_after_acc):.3}')
     if valid_after_acc > best_val_acc:  # evaluation
         best_val_acc = np.copy(valid_after_acc)
@@ -0,0 +1,100 @@
+#on-disk cache of windowed activity data
+#entries are keyed by the source .mat file (path, size, mtime) and the windowing parameters,
+#so editing or replacing the file invalidates them without any bookkeeping
+
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import scipy.io as sc
+from data_utils import SubjectIndex, SubjectWindows, get_act_data, get_act_time_sequences, split_act_columns
+
+default_cache_dir = './window_cache'
+
+#bump when the windowing output changes so old entries are not reused
+cache_version = 1
+
+#matrices loaded by this process, so a sweep over folds reads each .mat file once
+_loaded = {}
+
+
+def source_fingerprint(mat_path):
+    stat = os.stat(mat_path)
+    return {'path': os.path.abspath(mat_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def cache_key(mat_path, var_name, window_size, step, sub_range=None, columnar=False):
+    params = {'source': source_fingerprint(mat_path),
+              'var_name': var_name,
+              'window_size': int(window_size),
+              'step': int(step),
+              'sub_range': None if sub_range is None else [int(i) for i in sub_range],
+              'columnar': bool(columnar),
+              'version': cache_version}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def load_mat(mat_path, var_name, columnar=False):
+    """
+    the matrix (or its ActColumns) and its SubjectIndex, loaded once per process and file version
+    """
+    key = (json.dumps(source_fingerprint(mat_path), sort_keys=True), var_name, columnar)
+    if key not in _loaded:
+        file_data = sc.loadmat(mat_path)[var_name]
+        if columnar:
+            file_data = split_act_columns(file_data)
+        _loaded[key] = file_data, SubjectIndex(file_data)
+    return _loaded[key]
+
+
+def _save_entry(entry_dir, arrays):
+    tmp_dir = f'{entry_dir}.tmp{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, name + '.npy'), array)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # another process stored the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_act_time_sequences(mat_path, var_name, window_size, step, sub_range=None,
+                            cache_dir=default_cache_dir, mmap_mode='c', columnar=False):
+    """
+    get_act_time_sequences(get_act_data(matrix, sub_range), window_size, step) through the cache
+    sub_range None windows the whole matrix
+    columnar windows split_act_columns(matrix): float32 X, compact int y and u
+    arrays come back memory-mapped; the default copy-on-write mode lets callers shuffle them in place
+    """
+    entry_dir = os.path.join(cache_dir, cache_key(mat_path, var_name, window_size, step, sub_range, columnar))
+    names = ['X', 'y', 'u']
+
+    if not all(os.path.exists(os.path.join(entry_dir, name + '.npy')) for name in names):
+        file_data, subject_index = load_mat(mat_path, var_name, columnar)
+        if sub_range is not None:
+            file_data = get_act_data(file_data, sub_range, subject_index)
+        X, y, u = get_act_time_sequences(file_data, window_size, step)
+        os.makedirs(cache_dir, exist_ok=True)
+        _save_entry(entry_dir, {'X': X, 'y': y, 'u': u})
+
+    return tuple(np.load(os.path.join(entry_dir, name + '.npy'), mmap_mode=mmap_mode) for name in names)
+
+
+def clear_cache(cache_dir=default_cache_dir):
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def load_subject_windows(mat_path, var_name, window_size, step, sub_range, cache_dir=default_cache_dir,
+                         columnar=False):
+    """
+    SubjectWindows of every subject in sub_range, each subject windowed (and cached) on its own
+    subjects with no windows (or no rows in the matrix) are left out, as get_act_data contributes no rows for them
+    """
+    windows = {}
+    for i in sub_range:
+        X, y, u = load_act_time_sequences(mat_path, var_name, window_size, step, [i], cache_dir, columnar=columnar)
+        if len(y):
+            windows[i] = X, y, u
+    return SubjectWindows(windows)